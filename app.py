@@ -4,15 +4,34 @@ Lucid - Flask Web Application
 Simple web interface for browsing synthesized news stories.
 """
 
-from flask import Flask, render_template, jsonify, request, make_response
+from flask import (
+    Flask, Response, render_template, stream_template, stream_with_context, request, make_response
+)
 from flask_cors import CORS
+from flask_caching import Cache
+from flask_compress import Compress
+from jinja2 import FileSystemBytecodeCache
 from datetime import datetime
+from functools import lru_cache
+from typing import Optional
 import os
+import time
 import atexit
+import hashlib
+import threading
+import orjson
+
+# Optional C parser for ISO-8601 timestamps (much faster than fromisoformat)
+try:
+    from ciso8601 import parse_datetime as parse_iso_datetime
+except ImportError:
+    parse_iso_datetime = datetime.fromisoformat
 
 from config import (
-    FLASK_HOST, FLASK_PORT, FLASK_DEBUG, STORIES_PER_PAGE, REFRESH_INTERVAL_HOURS,
-    RELEVANCE_WEIGHT_SOURCES, RELEVANCE_WEIGHT_DIVERSITY, RELEVANCE_WEIGHT_RECENCY, RELEVANCE_BASE_SCORE
+    FLASK_HOST, FLASK_PORT, FLASK_DEBUG, STORIES_PER_PAGE, MAX_STORIES_PER_REQUEST, REFRESH_INTERVAL_HOURS,
+    CACHE_TYPE, CACHE_REDIS_URL, STATS_CACHE_TIMEOUT, INDEX_CACHE_TIMEOUT, JINJA_CACHE_DIR,
+    SNAPSHOT_MAX_AGE, SNAPSHOT_VERSION_CHECK, INDEX_STREAM_CHUNK_SIZE, SCHEDULER_LOCK_FILE, COMPRESS_ALGORITHM,
+    COMPRESS_ALGORITHM_STREAMING, COMPRESS_MIN_SIZE, COMPRESS_LEVEL
 )
 import database
 
@@ -23,6 +42,123 @@ import database
 app = Flask(__name__)
 CORS(app)
 
+cache_config = {'CACHE_TYPE': CACHE_TYPE}
+if CACHE_REDIS_URL:
+    cache_config['CACHE_REDIS_URL'] = CACHE_REDIS_URL
+cache = Cache(app, config=cache_config)
+
+app.config.update(
+    COMPRESS_ALGORITHM=COMPRESS_ALGORITHM,
+    COMPRESS_ALGORITHM_STREAMING=COMPRESS_ALGORITHM_STREAMING,
+    COMPRESS_MIN_SIZE=COMPRESS_MIN_SIZE,
+    COMPRESS_LEVEL=COMPRESS_LEVEL,  # gzip
+    COMPRESS_BR_LEVEL=COMPRESS_LEVEL,
+)
+Compress(app)
+
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+
+# =============================================================================
+# STATS SNAPSHOT (lets the polling endpoints skip the database)
+# =============================================================================
+
+_snapshot_lock = threading.Lock()
+_snapshot = None
+_snapshot_loaded_at = 0.0
+_snapshot_checked_at = 0.0
+
+
+def refresh_snapshot() -> dict:
+    """
+    Reload the in-memory stats snapshot from the database. If it changed, the
+    process-local caches are dropped first: the change may come from another
+    process, and page caches keyed on the new version must not be filled from
+    query results cached before it.
+    """
+    global _snapshot, _snapshot_loaded_at, _snapshot_checked_at
+    # Uncached on purpose: this read is how writes from other processes get noticed
+    stats = database.get_stats.__wrapped__()
+    snapshot = {
+        'stories_version': database.get_stories_version(),
+        'last_story_at': stats.get('last_story_at'),
+        'total_articles': stats['total_articles'],
+        'total_stories': stats['total_stories'],
+    }
+    snapshot['etag'] = hashlib.blake2b(orjson.dumps(snapshot), digest_size=16).hexdigest()
+    with _snapshot_lock:
+        previous = _snapshot
+    if previous is not None and previous['etag'] != snapshot['etag']:
+        database.invalidate_query_cache()
+        cache.clear()
+    with _snapshot_lock:
+        _snapshot = snapshot
+        _snapshot_loaded_at = _snapshot_checked_at = time.monotonic()
+    return snapshot
+
+
+def feed_time_bucket() -> int:
+    """
+    Current INDEX_CACHE_TIMEOUT-sized time window. Feed pages show relative
+    times and recency-weighted ordering, so they go stale as time passes even
+    without new stories.
+    """
+    return int(time.time()) // INDEX_CACHE_TIMEOUT
+
+
+def feed_etag(*parts) -> str:
+    """ETag for a feed page; changes whenever a new story lands or the time window rolls over."""
+    key = ':'.join(str(p) for p in parts).encode()
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+
+# Flask-Compress appends the content coding to strong ETags ("<hash>:br")
+_COMPRESSED_ETAG_SUFFIXES = (':br', ':gzip', ':deflate', ':zstd')
+
+
+def matching_etag(etag: str) -> Optional[str]:
+    """
+    The client's If-None-Match entry for `etag`, if any. Entries that came back
+    with a compression suffix still match; the suffixed form is returned so the
+    304 carries the validator the client holds.
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return etag
+    for tag in if_none_match.as_set(include_weak=True):
+        if tag == etag or any(tag == etag + suffix for suffix in _COMPRESSED_ETAG_SUFFIXES):
+            return tag
+    return None
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a client that already has the current page."""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def get_snapshot() -> dict:
+    """
+    Current stats snapshot. Refreshed when the pipeline finishes in this
+    process, within SNAPSHOT_VERSION_CHECK seconds of another process (the
+    scheduler leader, run.py) writing stories, and at least every
+    SNAPSHOT_MAX_AGE seconds for the article counts.
+    """
+    global _snapshot_checked_at
+    with _snapshot_lock:
+        snapshot, loaded_at, checked_at = _snapshot, _snapshot_loaded_at, _snapshot_checked_at
+    now = time.monotonic()
+    if snapshot is None or now - loaded_at > SNAPSHOT_MAX_AGE:
+        return refresh_snapshot()
+    if now - checked_at > SNAPSHOT_VERSION_CHECK:
+        with _snapshot_lock:
+            _snapshot_checked_at = now
+        if database.get_stories_version() != snapshot['stories_version']:
+            return refresh_snapshot()
+    return snapshot
+
+
 # =============================================================================
 # BACKGROUND SCHEDULER (for periodic pipeline runs)
 # =============================================================================
@@ -67,6 +203,10 @@ def run_pipeline_job(force_scrape: bool = False):
         else:
             print("[SCHEDULER] No unclustered articles to process")
 
+        # New data is in - drop cached responses
+        cache.clear()
+        refresh_snapshot()
+
         stats = database.get_stats()
         print(f"[SCHEDULER] Pipeline complete: {stats['total_articles']} articles, {stats['total_stories']} stories")
     except Exception as e:
@@ -84,6 +224,8 @@ def run_quick_pipeline():
             clusters = clusterer.run_clustering()
             if clusters:
                 synthesizer.run_synthesis(clusters)
+            cache.clear()
+            refresh_snapshot()
             stats = database.get_stats()
             print(f"[SCHEDULER] Quick pipeline complete: {stats['total_stories']} stories")
         else:
@@ -91,6 +233,30 @@ def run_quick_pipeline():
     except Exception as e:
         print(f"[SCHEDULER] Quick pipeline error: {e}")
 
+_scheduler_lock_file = None
+
+
+def acquire_scheduler_lock() -> bool:
+    """
+    Elect this process as the scheduler leader by taking an exclusive lock
+    on SCHEDULER_LOCK_FILE. The lock is held for the life of the process.
+    """
+    global _scheduler_lock_file
+    try:
+        import fcntl
+    except ImportError:
+        return True  # No flock (Windows) - single-process dev server
+
+    lock_file = open(SCHEDULER_LOCK_FILE, 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _scheduler_lock_file = lock_file
+    return True
+
+
 def init_scheduler():
     """Initialize the background scheduler if enabled."""
     global scheduler
@@ -98,6 +264,18 @@ def init_scheduler():
         print("[SCHEDULER] Disabled (set ENABLE_SCHEDULER=true to enable)")
         return
 
+    # `python app.py` in debug mode: the reloader parent only watches files and
+    # never serves, so leave the scheduler (and its cache invalidation) to the child
+    if __name__ == '__main__' and FLASK_DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        print("[SCHEDULER] Reloader parent - scheduler starts in the serving process")
+        return
+
+    # Under gunicorn every worker imports this module; only one may schedule jobs
+    # (the others notice its writes through get_snapshot's stories_version check)
+    if not acquire_scheduler_lock():
+        print(f"[SCHEDULER] Another process holds {SCHEDULER_LOCK_FILE} - not starting")
+        return
+
     try:
         from apscheduler.schedulers.background import BackgroundScheduler
         from datetime import datetime, timedelta
@@ -143,69 +321,58 @@ init_scheduler()
 # HELPER FUNCTIONS
 # =============================================================================
 
-def format_timestamp(iso_string: str) -> str:
-    """Format ISO timestamp to human-readable string."""
+def iso_to_epoch(iso_string: str) -> Optional[int]:
+    """Convert a stored ISO timestamp (local time) to a Unix epoch."""
     if not iso_string:
-        return ""
+        return None
     try:
-        dt = datetime.fromisoformat(iso_string)
-        now = datetime.now()
-        diff = now - dt
-
-        if diff.days == 0:
-            hours = diff.seconds // 3600
-            if hours == 0:
-                minutes = diff.seconds // 60
-                return f"{minutes}m ago" if minutes > 0 else "Just now"
-            return f"{hours}h ago"
-        elif diff.days == 1:
-            return "Yesterday"
-        elif diff.days < 7:
-            return f"{diff.days}d ago"
-        else:
-            return dt.strftime("%b %d")
+        return int(parse_iso_datetime(iso_string).timestamp())
     except (ValueError, TypeError):
-        return ""
+        return None
 
 
-def group_sources_by_lean(sources: list) -> dict:
-    """Group source articles by political lean."""
-    grouped = {'left': [], 'center': [], 'right': [], 'international': []}
-    for source in sources:
-        lean = source.get('source_lean', 'center')
-        if lean in grouped:
-            grouped[lean].append(source)
-        else:
-            grouped['center'].append(source)
-    return grouped
+@lru_cache(maxsize=4096)
+def _format_date_for_hour(hour: int) -> str:
+    """Format the local date for an epoch hour (hour buckets keep the date right in any whole-hour timezone)."""
+    return datetime.fromtimestamp(hour * 3600).strftime("%b %d")
 
 
-def calculate_relevance_score(story: dict, sources: list) -> int:
-    """
-    Calculate relevance score for a story based on:
-    - Number of sources covering it
-    - Diversity of political leans
-    - Recency
-    """
-    score = RELEVANCE_BASE_SCORE
+def format_timestamp(epoch: Optional[int], now_epoch: Optional[int] = None) -> str:
+    """Format a Unix epoch to a human-readable relative string."""
+    if not epoch:
+        return ""
+    if now_epoch is None:
+        now_epoch = int(time.time())
+    diff = now_epoch - epoch
 
-    # Source count bonus (more sources = bigger story)
-    source_count = len(sources)
-    score += source_count * RELEVANCE_WEIGHT_SOURCES
+    if diff < 0 or diff >= 7 * 86400:
+        return _format_date_for_hour(epoch // 3600)
+    elif diff < 3600:
+        minutes = diff // 60
+        return f"{minutes}m ago" if minutes > 0 else "Just now"
+    elif diff < 86400:
+        return f"{diff // 3600}h ago"
+    elif diff < 2 * 86400:
+        return "Yesterday"
+    else:
+        return f"{diff // 86400}d ago"
 
-    # Lean diversity bonus (coverage across spectrum = significant story)
-    unique_leans = set(s.get('source_lean', 'center') for s in sources)
-    score += len(unique_leans) * RELEVANCE_WEIGHT_DIVERSITY
 
-    # Recency penalty (older stories rank lower)
-    try:
-        created = datetime.fromisoformat(story.get('created_at', ''))
-        hours_old = (datetime.now() - created).total_seconds() / 3600
-        score -= int(hours_old * RELEVANCE_WEIGHT_RECENCY)
-    except (ValueError, TypeError):
-        pass
+def load_sources_grouped(story: dict) -> dict:
+    """Decode the sources-by-lean JSON precomputed when the story was stored."""
+    raw = story.pop('sources_grouped_json', None)
+    return orjson.loads(raw) if raw else database.group_sources_by_lean([])
+
+
+@cache.memoize(timeout=STATS_CACHE_TIMEOUT)
+def get_cached_stats() -> dict:
+    """Database stats, memoized briefly since every page view and poll needs them."""
+    return database.get_stats()
+
 
-    return max(0, min(100, score))  # Clamp between 0-100
+def json_response(obj, status: int = 200) -> Response:
+    """Serialize an API payload with orjson (much faster than jsonify for story lists)."""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
 
 
 # =============================================================================
@@ -215,30 +382,76 @@ def calculate_relevance_score(story: dict, sources: list) -> int:
 @app.route('/')
 def index():
     """Main feed page."""
-    page = request.args.get('page', 1, type=int)
+    page = max(1, request.args.get('page', 1, type=int))
+    # The feed changes when new stories land and as its relative times age
+    version = f"{get_snapshot()['last_story_at']}:{feed_time_bucket()}"
+    etag = feed_etag('index', page, version)
+    client_etag = matching_etag(etag)
+    if client_etag:
+        return not_modified(client_etag)
+
+    cache_key = f'index:{page}:{version}'
+    html = cache.get(cache_key)
+    if html is not None:
+        response = make_response(html)
+    else:
+        # Stream the first render so the browser can start on the header early
+        chunks = stream_template('index.html', **_index_context(page))
+        response = Response(stream_with_context(_tee_to_cache(chunks, cache_key)),
+                            mimetype='text/html')
+    response.set_etag(etag)
+    return response
+
+
+def _index_context(page: int) -> dict:
+    """Template context for one page of the main feed."""
     offset = (page - 1) * STORIES_PER_PAGE
+    now_epoch = int(time.time())
 
-    stories = database.get_stories(limit=STORIES_PER_PAGE, offset=offset)
+    # Relevance ranking and pagination happen in SQL
+    stories = database.get_stories_ranked(limit=STORIES_PER_PAGE, offset=offset)
     total_stories = database.get_stories_count()
     total_pages = (total_stories + STORIES_PER_PAGE - 1) // STORIES_PER_PAGE if total_stories > 0 else 1
 
     for story in stories:
-        story['sources'] = database.get_sources_for_story(story['id'])
-        story['sources_grouped'] = group_sources_by_lean(story['sources'])
-        story['time_ago'] = format_timestamp(story['created_at'])
-        story['relevance_score'] = calculate_relevance_score(story, story['sources'])
+        story['sources_grouped'] = load_sources_grouped(story)
+        # Same order as database.get_sources_for_story (lean, then source name)
+        story['sources'] = [src for lean in sorted(story['sources_grouped'])
+                            for src in story['sources_grouped'][lean]]
+        story['time_ago'] = format_timestamp(story['created_at_epoch'], now_epoch)
 
-    # Sort by relevance score (highest first)
-    stories.sort(key=lambda s: s['relevance_score'], reverse=True)
+    stats = get_cached_stats()
+    stats['last_updated'] = format_timestamp(iso_to_epoch(stats.get('last_story_at')), now_epoch)
 
-    stats = database.get_stats()
-    stats['last_updated'] = format_timestamp(stats.get('last_story_at'))
+    return {
+        'stories': stories,
+        'page': page,
+        'total_pages': total_pages,
+        'stats': stats,
+    }
 
-    return render_template('index.html',
-                           stories=stories,
-                           page=page,
-                           total_pages=total_pages,
-                           stats=stats)
+
+def _tee_to_cache(chunks, cache_key: str):
+    """
+    Yield rendered template output in INDEX_STREAM_CHUNK_SIZE pieces and
+    cache the full page once it has been sent.
+    """
+    parts = []
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= INDEX_STREAM_CHUNK_SIZE:
+            piece = ''.join(buffer)
+            parts.append(piece)
+            yield piece
+            buffer, buffered = [], 0
+    if buffer:
+        piece = ''.join(buffer)
+        parts.append(piece)
+        yield piece
+    cache.set(cache_key, ''.join(parts), timeout=INDEX_CACHE_TIMEOUT)
 
 
 @app.route('/story/<int:story_id>')
@@ -248,40 +461,46 @@ def story_detail(story_id: int):
     if not story:
         return "Story not found", 404
 
-    story['sources_grouped'] = group_sources_by_lean(story['sources'])
-    story['time_ago'] = format_timestamp(story['created_at'])
+    story['sources_grouped'] = database.group_sources_by_lean(story['sources'])
+    story['time_ago'] = format_timestamp(story['created_at_epoch'])
 
     return render_template('index.html',
                            story=story,
                            single_view=True,
-                           stats=database.get_stats())
+                           stats=get_cached_stats())
 
 
 @app.route('/api/stories')
 def api_stories():
     """API endpoint for stories."""
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', STORIES_PER_PAGE, type=int)
+    page = max(1, request.args.get('page', 1, type=int))
+    # Bounded: SQLite treats a negative LIMIT as none, and huge pages overflow the sources query
+    limit = max(1, min(request.args.get('limit', STORIES_PER_PAGE, type=int), MAX_STORIES_PER_REQUEST))
     offset = (page - 1) * limit
 
-    # Get more stories than requested so we can sort by relevance, then paginate
-    all_stories = database.get_stories(limit=1000, offset=0)
-    for story in all_stories:
-        story['sources'] = database.get_sources_for_story(story['id'])
-        story['time_ago'] = format_timestamp(story['created_at'])
-        story['relevance_score'] = calculate_relevance_score(story, story['sources'])
-
-    # Sort by relevance score (highest first)
-    all_stories.sort(key=lambda s: s['relevance_score'], reverse=True)
-
-    # Paginate after sorting
-    stories = all_stories[offset:offset + limit]
+    # Answer unchanged polls from the snapshot, before touching the database
+    etag = feed_etag('stories', page, limit, get_snapshot()['last_story_at'], feed_time_bucket())
+    client_etag = matching_etag(etag)
+    if client_etag:
+        return not_modified(client_etag)
+
+    # Relevance ranking and pagination happen in SQL
+    stories = database.get_stories_ranked(limit=limit, offset=offset)
+    # Sources arrive as JSON text from SQLite and are spliced in without re-encoding
+    sources_by_story = database.get_sources_json_for_stories([s['id'] for s in stories])
+    now_epoch = int(time.time())
+    for story in stories:
+        story.pop('sources_grouped_json', None)
+        story['sources'] = orjson.Fragment(sources_by_story.get(story['id'], '[]'))
+        story['time_ago'] = format_timestamp(story['created_at_epoch'], now_epoch)
 
-    return jsonify({
+    response = json_response({
         'stories': stories,
         'page': page,
         'total': database.get_stories_count()
     })
+    response.set_etag(etag)
+    return response
 
 
 @app.route('/api/story/<int:story_id>')
@@ -289,38 +508,42 @@ def api_story(story_id: int):
     """API endpoint for single story."""
     story = database.get_story_with_sources(story_id)
     if not story:
-        return jsonify({'error': 'Not found'}), 404
-    story['time_ago'] = format_timestamp(story['created_at'])
-    return jsonify(story)
+        return json_response({'error': 'Not found'}, 404)
+    story['time_ago'] = format_timestamp(story['created_at_epoch'])
+    return json_response(story)
 
 
 @app.route('/api/stats')
+@cache.cached(timeout=STATS_CACHE_TIMEOUT)
 def api_stats():
     """API endpoint for database stats."""
-    stats = database.get_stats()
-    stats['last_updated'] = format_timestamp(stats.get('last_story_at'))
-    return jsonify(stats)
+    stats = get_cached_stats()
+    stats['last_updated'] = format_timestamp(iso_to_epoch(stats.get('last_story_at')))
+    return json_response(stats)
 
 
 @app.route('/api/last-updated')
 def api_last_updated():
-    """API endpoint for last update timestamp."""
-    stats = database.get_stats()
-    return jsonify({'last_story_at': stats.get('last_story_at')})
+    """API endpoint for last update timestamp (served from memory, supports ETag)."""
+    snapshot = get_snapshot()
+    response = json_response({'last_story_at': snapshot['last_story_at']})
+    response.headers['Cache-Control'] = f'public, max-age={SNAPSHOT_MAX_AGE}'
+    response.set_etag(snapshot['etag'])
+    return response.make_conditional(request)
 
 
 @app.route('/api/health')
 def api_health():
     """Health check endpoint."""
     try:
-        stats = database.get_stats()
-        return jsonify({
+        snapshot = get_snapshot()
+        return json_response({
             'status': 'healthy',
-            'articles': stats['total_articles'],
-            'stories': stats['total_stories']
+            'articles': snapshot['total_articles'],
+            'stories': snapshot['total_stories']
         })
     except Exception as e:
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+        return json_response({'status': 'unhealthy', 'error': str(e)}, 500)
 
 
 @app.route('/api/refresh', methods=['POST'])
@@ -329,48 +552,65 @@ def api_refresh():
     try:
         force = request.args.get('force', 'false').lower() == 'true'
 
+        if scheduler is not None:
+            # One-shot job: the scheduler never runs two manual refreshes at once
+            scheduler.add_job(
+                run_pipeline_job,
+                'date',
+                kwargs={'force_scrape': force},
+                id='manual_refresh',
+                coalesce=True,
+                max_instances=1,
+                replace_existing=True
+            )
+            print(f"[REFRESH] Queued manual pipeline (force_scrape={force})")
+            return json_response({'status': 'queued'}, 202)
+
         print(f"[REFRESH] Starting manual pipeline (force_scrape={force})...")
         run_pipeline_job(force_scrape=force)
 
         stats = database.get_stats()
         print(f"[REFRESH] Complete! Articles: {stats['total_articles']}, Stories: {stats['total_stories']}")
 
-        return jsonify({
+        return json_response({
             'status': 'completed',
             'articles': stats['total_articles'],
             'stories': stats['total_stories']
         })
     except Exception as e:
         print(f"[REFRESH] Error: {e}")
-        return jsonify({'status': 'error', 'error': str(e)}), 500
+        return json_response({'status': 'error', 'error': str(e)}, 500)
 
 
 # =============================================================================
 # TEMPLATE FILTERS
 # =============================================================================
 
+LEAN_COLORS = {
+    'left': 'lean-left',
+    'center': 'lean-center',
+    'right': 'lean-right',
+    'international': 'lean-international'
+}
+
+LEAN_DOTS = {
+    'left': '#5dade2',
+    'center': '#95a5a6',
+    'right': '#e74c3c',
+    'international': '#58d68d'
+}
+
+
 @app.template_filter('lean_color')
 def lean_color(lean: str) -> str:
     """Return CSS class for political lean."""
-    colors = {
-        'left': 'lean-left',
-        'center': 'lean-center',
-        'right': 'lean-right',
-        'international': 'lean-international'
-    }
-    return colors.get(lean, 'lean-center')
+    return LEAN_COLORS.get(lean, 'lean-center')
 
 
 @app.template_filter('lean_dot')
 def lean_dot(lean: str) -> str:
     """Return dot color for political lean."""
-    dots = {
-        'left': '#5dade2',
-        'center': '#95a5a6',
-        'right': '#e74c3c',
-        'international': '#58d68d'
-    }
-    return dots.get(lean, '#95a5a6')
+    return LEAN_DOTS.get(lean, '#95a5a6')
 
 
 # =============================================================================
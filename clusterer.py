@@ -4,12 +4,15 @@ Lucid - Article Clusterer
 Generates embeddings via Jina AI API and clusters related stories using cosine similarity.
 """
 
-import pickle
 import os
 import time
+import threading
 import numpy as np
 import requests
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple
 
 # =============================================================================
 # CLUSTERING CONFIG
@@ -18,35 +21,79 @@ from config import (
     SIMILARITY_THRESHOLD,
     MIN_SOURCES_FOR_STORY,
     MAX_ARTICLES_FOR_CLUSTERING,
-    CLUSTERING_WINDOW_HOURS
+    CLUSTERING_WINDOW_HOURS,
+    EMBEDDING_DIM,
+    SIMILARITY_BACKEND
 )
 import database
 
+# Optional: SciPy's C connected-components (falls back to a pure-Python union-find)
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:
+    connected_components = None
+
+# Optional: Numba-compiled union-find, used when SciPy is not installed
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Optional: SimSIMD cosine kernels (only used when SIMILARITY_BACKEND = "simsimd")
+simsimd = None
+if SIMILARITY_BACKEND == "simsimd":
+    try:
+        import simsimd
+    except ImportError:
+        print("WARNING: simsimd not installed, using NumPy for similarity")
+
 # Jina AI API config (free tier: 1M tokens/month)
 JINA_API_KEY = os.environ.get('JINA_API_KEY', '')
 JINA_API_URL = "https://api.jina.ai/v1/embeddings"
 JINA_MODEL = "jina-embeddings-v3"
 EMBEDDING_BATCH_SIZE = 100  # Jina allows up to 2048 per request
+JINA_MAX_WORKERS = 4  # Concurrent batch requests
+JINA_REQUEST_INTERVAL = 0.5  # Min seconds between request starts - be nice to the API
+JINA_MAX_RETRIES = 3
+EMBED_PAGE_SIZE = EMBEDDING_BATCH_SIZE * JINA_MAX_WORKERS  # Articles read + embedded per page
+EMBED_LEDE_CHARS = 500  # Lede prefix used in the embedding text (saves API tokens)
 
-# =============================================================================
-# JINA AI EMBEDDING FUNCTIONS
-# =============================================================================
+_jina_rate_lock = threading.Lock()
+_jina_next_request_at = 0.0
 
-def generate_embeddings_batch(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> Optional[np.ndarray]:
-    """Generate embeddings using Jina AI API."""
-    if not JINA_API_KEY:
-        print("ERROR: JINA_API_KEY not set!")
-        print("Get a free API key at: https://jina.ai/embeddings/")
-        return None
+# Pooled keep-alive connections shared by the embedding workers
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=JINA_MAX_WORKERS))
 
-    all_embeddings = []
+# Rows per tile when scanning for similar pairs (256x256 float32 tile = 256 KB)
+SIMILARITY_BLOCK_SIZE = 256
 
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        print(f"  Embedding batch {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1} ({len(batch)} texts)...")
+# Below this many articles, clustering skips SciPy and Numba (fixed setup cost,
+# or a ~1 s JIT compile on first use) and runs the pure-Python union-find
+SMALL_GRAPH_SIZE = 32
+
+# =============================================================================
+# JINA AI EMBEDDING FUNCTIONS
+# =============================================================================
 
+def _wait_for_jina_slot():
+    """Space request starts JINA_REQUEST_INTERVAL apart across all worker threads."""
+    global _jina_next_request_at
+    with _jina_rate_lock:
+        now = time.monotonic()
+        start_at = max(now, _jina_next_request_at)
+        _jina_next_request_at = start_at + JINA_REQUEST_INTERVAL
+    if start_at > now:
+        time.sleep(start_at - now)
+
+
+def _embed_one_batch(batch_index: int, batch: List[str]) -> tuple:
+    """POST one batch to Jina (with retries). Returns (batch_index, embeddings)."""
+    for attempt in range(JINA_MAX_RETRIES):
+        _wait_for_jina_slot()
         try:
-            response = requests.post(
+            response = _session.post(
                 JINA_API_URL,
                 headers={
                     "Authorization": f"Bearer {JINA_API_KEY}",
@@ -55,7 +102,7 @@ def generate_embeddings_batch(texts: List[str], batch_size: int = EMBEDDING_BATC
                 json={
                     "model": JINA_MODEL,
                     "task": "text-matching",
-                    "dimensions": 512,
+                    "dimensions": EMBEDDING_DIM,
                     "input": batch
                 },
                 timeout=60
@@ -64,31 +111,81 @@ def generate_embeddings_batch(texts: List[str], batch_size: int = EMBEDDING_BATC
             data = response.json()
 
             # Extract embeddings in order
-            batch_embeddings = [item['embedding'] for item in data['data']]
-            all_embeddings.extend(batch_embeddings)
+            return batch_index, [item['embedding'] for item in data['data']]
+        except requests.exceptions.RequestException as e:
+            if attempt == JINA_MAX_RETRIES - 1:
+                raise
+            print(f"  Jina API error on batch {batch_index + 1} (attempt {attempt + 1}): {e}")
+            time.sleep(2 ** attempt)
 
-            # Rate limiting - be nice to the API
-            if i + batch_size < len(texts):
-                time.sleep(0.5)
 
-        except requests.exceptions.RequestException as e:
-            print(f"  Jina API error: {e}")
-            return None
-        except (KeyError, IndexError) as e:
-            print(f"  Error parsing Jina response: {e}")
-            return None
+def generate_embeddings_batch(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> Optional[np.ndarray]:
+    """Generate embeddings using Jina AI API (batches are sent concurrently)."""
+    if not JINA_API_KEY:
+        print("ERROR: JINA_API_KEY not set!")
+        print("Get a free API key at: https://jina.ai/embeddings/")
+        return None
+
+    if not texts:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+    # Batch texts of similar length together (less padding per batch),
+    # then put the embeddings back in the caller's order at the end
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    sorted_texts = [texts[i] for i in order]
+    batches = [sorted_texts[i:i + batch_size] for i in range(0, len(sorted_texts), batch_size)]
+    print(f"  Embedding {len(texts)} texts in {len(batches)} batches ({JINA_MAX_WORKERS} concurrent)...")
+
+    results = [None] * len(batches)
+    try:
+        with ThreadPoolExecutor(max_workers=JINA_MAX_WORKERS) as executor:
+            futures = [executor.submit(_embed_one_batch, i, batch) for i, batch in enumerate(batches)]
+            for future in as_completed(futures):
+                batch_index, batch_embeddings = future.result()
+                results[batch_index] = batch_embeddings
+    except requests.exceptions.RequestException as e:
+        print(f"  Jina API error: {e}")
+        return None
+    except (KeyError, IndexError) as e:
+        print(f"  Error parsing Jina response: {e}")
+        return None
 
-    return np.array(all_embeddings)
+    embeddings = np.empty((len(texts), len(results[0][0])), dtype=np.float32)
+    embeddings[order] = [embedding for batch in results for embedding in batch]
+    return embeddings
 
 
 def embedding_to_bytes(embedding: np.ndarray) -> bytes:
-    """Convert numpy array to bytes for storage."""
-    return pickle.dumps(embedding)
+    """
+    Quantize an embedding to int8 for storage: a float32 scale followed by
+    one signed byte per dimension (cosine error ~1e-3, 4x smaller than float32).
+    The scale is 1/||q||, so stored vectors decode to unit length.
+    """
+    embedding = np.asarray(embedding, dtype=np.float32)
+    step = float(np.abs(embedding).max()) / 127 or 1.0
+    quantized = np.clip(np.round(embedding / step), -127, 127).astype(np.int8)
+    scale = 1.0 / (float(np.linalg.norm(quantized.astype(np.float32))) or 1.0)
+    return np.float32(scale).tobytes() + quantized.tobytes()
 
 
 def bytes_to_embedding(data: bytes) -> np.ndarray:
-    """Convert stored bytes back to numpy array."""
-    return pickle.loads(data)
+    """Convert stored bytes back to a unit-length float32 array."""
+    if len(data) != 4 + EMBEDDING_DIM:
+        raise ValueError(f"expected {EMBEDDING_DIM} dimensions, got {len(data) - 4}")
+    scale = np.frombuffer(data, dtype=np.float32, count=1)[0]
+    return np.frombuffer(data, dtype=np.int8, offset=4).astype(np.float32) * scale
+
+
+def blobs_to_matrix(blobs: List[bytes]) -> np.ndarray:
+    """
+    Decode many stored embeddings into one (N, EMBEDDING_DIM) float32 matrix.
+    One join + vectorized dequantization; no per-article arrays.
+    """
+    raw = np.frombuffer(b''.join(blobs), dtype=np.uint8).reshape(len(blobs), 4 + EMBEDDING_DIM)
+    scales = raw[:, :4].copy().view(np.float32)
+    matrix = raw[:, 4:].view(np.int8).astype(np.float32)
+    matrix *= scales
+    return matrix
 
 
 def compute_article_text(article: Dict) -> str:
@@ -96,7 +193,7 @@ def compute_article_text(article: Dict) -> str:
     headline = article.get('headline', '')
     lede = article.get('lede', '')
     # Limit text length to save API tokens
-    combined = f"{headline}. {lede[:500]}" if lede else headline
+    combined = f"{headline}. {lede[:EMBED_LEDE_CHARS]}" if lede else headline
     return combined[:1000]
 
 
@@ -108,41 +205,141 @@ def embed_new_articles():
     """Generate and store embeddings for articles that don't have them."""
     print("\nGenerating embeddings for new articles...")
 
-    articles = database.get_articles_without_embedding(limit=MAX_ARTICLES_FOR_CLUSTERING)
-    if not articles:
-        print("No new articles to embed")
-        return 0
-
-    print(f"Found {len(articles)} articles without embeddings")
+    total = 0
+    # Stream in pages: read a page, embed it, write it back, then read the next
+    for articles in database.iter_articles_without_embedding(
+        batch_size=EMBED_PAGE_SIZE, limit=MAX_ARTICLES_FOR_CLUSTERING, lede_chars=EMBED_LEDE_CHARS
+    ):
+        print(f"Embedding {len(articles)} articles without embeddings")
 
-    # Prepare texts
-    texts = [compute_article_text(a) for a in articles]
+        # Prepare texts
+        texts = [compute_article_text(a) for a in articles]
 
-    # Generate embeddings via API
-    embeddings = generate_embeddings_batch(texts)
+        # Generate embeddings via API
+        embeddings = generate_embeddings_batch(texts)
 
-    if embeddings is None:
-        print("Failed to generate embeddings")
-        return 0
+        if embeddings is None:
+            print("Failed to generate embeddings")
+            break
 
-    # Store embeddings
-    for article, embedding in zip(articles, embeddings):
-        database.update_article_embedding(article['id'], embedding_to_bytes(embedding))
+        # Store embeddings
+        database.update_article_embeddings_bulk(
+            [(embedding_to_bytes(embedding), article['id']) for article, embedding in zip(articles, embeddings)]
+        )
+        total += len(articles)
 
-    print(f"Generated embeddings for {len(articles)} articles")
-    return len(articles)
+    if total:
+        print(f"Generated embeddings for {total} articles")
+    else:
+        print("No new articles embedded")
+    return total
 
 
 # =============================================================================
 # CLUSTERING FUNCTIONS
 # =============================================================================
 
-def build_similarity_matrix(embeddings: List[np.ndarray]) -> np.ndarray:
-    """Build a pairwise cosine similarity matrix."""
-    # Normalize embeddings for faster computation
-    normalized = np.array([e / np.linalg.norm(e) for e in embeddings])
-    # Compute similarity matrix
-    return np.dot(normalized, normalized.T)
+def similarity_tile(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cosine similarities between the unit-length rows of a and b."""
+    if simsimd is not None:
+        return 1 - np.asarray(simsimd.cdist(a, b, metric='cosine'), dtype=np.float32)
+    return a @ b.T
+
+
+def find_similar_pairs(
+    normalized: np.ndarray,
+    similarity_threshold: float,
+    block_size: int = SIMILARITY_BLOCK_SIZE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index pairs (i < j) of rows whose cosine similarity meets the threshold.
+    Works tile by tile, so the full N x N matrix is never held in memory.
+    """
+    n = len(normalized)
+    rows, cols = [], []
+    for i0 in range(0, n, block_size):
+        block_i = normalized[i0:i0 + block_size]
+        for j0 in range(i0, n, block_size):
+            mask = similarity_tile(block_i, normalized[j0:j0 + block_size]) >= similarity_threshold
+            if j0 == i0:
+                mask = np.triu(mask, k=1)
+            r, c = np.nonzero(mask)
+            rows.append(r + i0)
+            cols.append(c + j0)
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _union_find_roots(n, rows, cols):
+        """Component root of each index for the given edges (compiled union-find)."""
+        parent = np.arange(n)
+        rank = np.zeros(n, dtype=np.int64)
+        for k in range(rows.shape[0]):
+            root_i = rows[k]
+            while parent[root_i] != root_i:
+                parent[root_i] = parent[parent[root_i]]
+                root_i = parent[root_i]
+            root_j = cols[k]
+            while parent[root_j] != root_j:
+                parent[root_j] = parent[parent[root_j]]
+                root_j = parent[root_j]
+            if root_i == root_j:
+                continue
+            if rank[root_i] < rank[root_j]:
+                root_i, root_j = root_j, root_i
+            parent[root_j] = root_i
+            if rank[root_i] == rank[root_j]:
+                rank[root_i] += 1
+        for x in range(n):
+            root = x
+            while parent[root] != root:
+                root = parent[root]
+            parent[x] = root
+        return parent
+else:
+    _union_find_roots = None
+
+
+def find_connected_groups(n: int, rows: np.ndarray, cols: np.ndarray) -> List[List[int]]:
+    """
+    Group indices 0..n-1 joined by the edges (rows[k], cols[k]).
+    Returns only groups with at least two members.
+    """
+    # SciPy's fixed setup cost (~200us) and Numba's first-call compile lose to
+    # the plain union-find on tiny graphs; Numba only stands in for a missing SciPy
+    if n >= SMALL_GRAPH_SIZE and connected_components is not None:
+        adjacency = csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+        _, labels = connected_components(adjacency, directed=False)
+        roots = labels.tolist()
+    elif n >= SMALL_GRAPH_SIZE and _union_find_roots is not None:
+        roots = _union_find_roots(n, rows.astype(np.int64), cols.astype(np.int64)).tolist()
+    else:
+        # Union-find fallback (path halving + union by rank)
+        parent = list(range(n))
+        rank = [0] * n
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            root_i, root_j = find(i), find(j)
+            if root_i == root_j:
+                continue
+            if rank[root_i] < rank[root_j]:
+                root_i, root_j = root_j, root_i
+            parent[root_j] = root_i
+            if rank[root_i] == rank[root_j]:
+                rank[root_i] += 1
+        roots = [find(idx) for idx in range(n)]
+
+    groups = defaultdict(list)
+    for idx, root in enumerate(roots):
+        groups[root].append(idx)
+    return [members for members in groups.values() if len(members) > 1]
 
 
 def cluster_articles(
@@ -161,17 +358,19 @@ def cluster_articles(
     print(f"  Similarity threshold: {similarity_threshold}")
     print(f"  Min sources per story: {min_sources}")
 
-    # Extract embeddings
-    embeddings = []
+    # Collect well-formed embedding blobs
+    blob_size = 4 + EMBEDDING_DIM
+    blobs = []
     valid_articles = []
     for article in articles:
-        if article.get('embedding'):
-            try:
-                emb = bytes_to_embedding(article['embedding'])
-                embeddings.append(emb)
+        blob = article.get('embedding')
+        if blob:
+            if len(blob) == blob_size:
+                blobs.append(blob)
                 valid_articles.append(article)
-            except Exception as e:
-                print(f"  Warning: Could not load embedding for article {article['id']}: {e}")
+            else:
+                print(f"  Warning: Could not load embedding for article {article['id']}: "
+                      f"expected {blob_size} bytes, got {len(blob)}")
 
     if len(valid_articles) < 2:
         print("  Not enough articles with embeddings to cluster")
@@ -179,62 +378,14 @@ def cluster_articles(
 
     print(f"  {len(valid_articles)} articles have valid embeddings")
 
-    # Build similarity matrix
-    similarity_matrix = build_similarity_matrix(embeddings)
-
-    # Greedy clustering
-    n = len(valid_articles)
-    clusters = []
-
-    # Sort article pairs by similarity (highest first)
-    pairs = []
-    for i in range(n):
-        for j in range(i + 1, n):
-            if similarity_matrix[i, j] >= similarity_threshold:
-                pairs.append((i, j, similarity_matrix[i, j]))
-
-    pairs.sort(key=lambda x: -x[2])  # Sort by similarity descending
-
-    # Build clusters greedily
-    article_to_cluster = {}
-
-    for i, j, sim in pairs:
-        cluster_i = article_to_cluster.get(i)
-        cluster_j = article_to_cluster.get(j)
-
-        if cluster_i is None and cluster_j is None:
-            # Start new cluster
-            new_cluster_idx = len(clusters)
-            clusters.append({i, j})
-            article_to_cluster[i] = new_cluster_idx
-            article_to_cluster[j] = new_cluster_idx
-        elif cluster_i is not None and cluster_j is None:
-            # Add j to i's cluster
-            clusters[cluster_i].add(j)
-            article_to_cluster[j] = cluster_i
-        elif cluster_i is None and cluster_j is not None:
-            # Add i to j's cluster
-            clusters[cluster_j].add(i)
-            article_to_cluster[i] = cluster_j
-        elif cluster_i != cluster_j:
-            # Merge clusters (add smaller to larger)
-            if len(clusters[cluster_i]) >= len(clusters[cluster_j]):
-                clusters[cluster_i].update(clusters[cluster_j])
-                for idx in clusters[cluster_j]:
-                    article_to_cluster[idx] = cluster_i
-                clusters[cluster_j] = set()  # Mark as merged
-            else:
-                clusters[cluster_j].update(clusters[cluster_i])
-                for idx in clusters[cluster_i]:
-                    article_to_cluster[idx] = cluster_j
-                clusters[cluster_i] = set()  # Mark as merged
+    # Article pairs above the threshold; clusters are the connected components
+    # Stored embeddings are already unit length, so no normalization pass here
+    rows, cols = find_similar_pairs(blobs_to_matrix(blobs), similarity_threshold)
+    clusters = find_connected_groups(len(valid_articles), rows, cols)
 
     # Filter and convert clusters
     result_clusters = []
     for cluster_indices in clusters:
-        if not cluster_indices:
-            continue
-
         cluster_articles = [valid_articles[i] for i in cluster_indices]
 
         # Check minimum sources requirement
@@ -277,11 +428,11 @@ def run_clustering() -> List[List[Dict]]:
         print("No new articles to cluster")
         return []
 
-    # Step 3: Get articles with embeddings
-    all_articles = database.get_articles_with_embeddings(hours=CLUSTERING_WINDOW_HOURS)
-
-    # Filter to only unclustered
-    articles_to_cluster = [a for a in all_articles if a['id'] in unclustered_ids]
+    # Step 3: Get unclustered articles with embeddings (filtered as rows stream in)
+    articles_to_cluster = [
+        a for a in database.iter_articles_with_embeddings(hours=CLUSTERING_WINDOW_HOURS)
+        if a['id'] in unclustered_ids
+    ]
     print(f"Processing {len(articles_to_cluster)} articles for clustering")
 
     # Step 4: Cluster
@@ -4,6 +4,9 @@ Lucid - Central Configuration
 All configuration variables in one place. Edit these to customize behavior.
 """
 
+import os
+import tempfile
+
 # =============================================================================
 # NEWS SOURCES CONFIG
 # =============================================================================
@@ -59,6 +62,13 @@ NEWS_SOURCES = [
 # Embeddings are generated via Jina AI API (free tier: 1M tokens/month)
 # Get your free API key at: https://jina.ai/embeddings/
 
+# Embedding vector size requested from Jina (stored as raw float32)
+EMBEDDING_DIM = 512
+
+# Similarity kernel: "numpy" (BLAS matmul) or "simsimd" (SIMD cdist, if installed)
+# BLAS is usually faster for all-pairs tiles; benchmark before switching
+SIMILARITY_BACKEND = os.environ.get("SIMILARITY_BACKEND", "numpy")
+
 # Cosine similarity threshold for clustering (0.0 - 1.0)
 # Higher = stricter matching, fewer clusters
 # Lower = looser matching, more articles grouped together
@@ -100,28 +110,63 @@ RELEVANCE_BASE_SCORE = 50
 # For Ollama: "llama3.1:8b", "llama3.1:70b", "mistral:7b", "mixtral:8x7b"
 # For Groq: "llama-3.1-8b-instant", "llama-3.3-70b-versatile", "mixtral-8x7b-32768"
 # For Together: "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo"
+# For Anthropic: "claude-3-5-haiku-latest", "claude-sonnet-4-0"
 LLM_MODEL = "llama-3.3-70b-versatile"
 
-# LLM provider: "ollama" (local), "groq", "together"
+# LLM provider: "ollama" (local), "groq", "together", "anthropic"
 LLM_PROVIDER = "groq"
 
 # API keys (only needed for cloud providers)
 # Get your free Groq key at: https://console.groq.com/keys
 # In production, set GROQ_API_KEY environment variable instead
-import os
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")  # Set via environment variable
 TOGETHER_API_KEY = os.environ.get("TOGETHER_API_KEY", "")  # Get from https://api.together.xyz/
+ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")  # Get from https://console.anthropic.com/
 
 # Ollama settings
 OLLAMA_HOST = "http://localhost:11434"
 
+# Ask for schema-constrained output (json_schema response_format / Ollama format schema)
+# instead of plain JSON mode; only enable for models that support structured outputs
+LLM_JSON_SCHEMA = os.environ.get("LLM_JSON_SCHEMA", "").lower() in ("1", "true", "yes")
+
+# Stream completions and stop reading as soon as the JSON object closes
+# (Groq's JSON mode does not support streaming; leave off there)
+LLM_STREAM = os.environ.get("LLM_STREAM", "").lower() in ("1", "true", "yes")
+
 # Generation parameters
 MAX_TOKENS = 3000  # Max length of generated summaries (doubled for deeper analysis)
 TEMPERATURE = 0.3  # Lower = more deterministic (0.0 - 1.0)
 
 # Retry settings for API calls
 LLM_MAX_RETRIES = 3
-LLM_RETRY_DELAY = 2  # seconds
+LLM_RETRY_DELAY = 2  # seconds; doubles per attempt, plus jitter
+LLM_MAX_RETRY_DELAY = 30  # seconds; cap on the backoff (a provider's Retry-After still wins)
+
+# Articles in a cluster at or above this embedding similarity are treated as reprints;
+# only the first goes into the prompt (all of them are still linked to the story)
+NEAR_DUPLICATE_THRESHOLD = 0.95
+
+# Token budget for article text in one cluster's prompt, shared across its articles
+# (exact with tiktoken installed, else estimated at ~4 characters per token)
+MAX_PROMPT_TOKENS = 8000
+
+# Only synthesize clusters covered by at least two leans (nothing to contrast otherwise);
+# skipped articles stay unclustered and get another chance as more coverage arrives
+REQUIRE_CROSS_LEAN = True
+
+# Per-cluster synthesis logging (sources, cache hits, each created story); errors always print
+VERBOSE = os.environ.get("VERBOSE", "").lower() in ("1", "true", "yes")
+
+# Clusters synthesized concurrently (keep within the provider's rate limits)
+SYNTHESIS_MAX_WORKERS = 4
+
+# Clusters per LLM request; >1 shares the instruction tokens and round trip across
+# several clusters (output budget scales with it, so use a model with room to spare)
+SYNTHESIS_BATCH_SIZE = 1
+
+# Max LLM request starts per minute across all workers (Groq free tier: 30); 0 = unlimited
+LLM_REQUESTS_PER_MINUTE = 30
 
 # =============================================================================
 # APP CONFIG
@@ -131,17 +176,42 @@ LLM_RETRY_DELAY = 2  # seconds
 # How often to automatically refresh data (in hours)
 REFRESH_INTERVAL_HOURS = 6
 
+# Only one process per host runs the scheduler; the others serve requests only
+SCHEDULER_LOCK_FILE = os.path.join(tempfile.gettempdir(), "lucid_scheduler.lock")
+
 # Maximum stories to keep in the database
 MAX_STORIES_IN_FEED = 100  # More stories in the feed
 
 # Stories per page for pagination
 STORIES_PER_PAGE = 12  # More per page
 
+# Largest ?limit= the stories API accepts
+MAX_STORIES_PER_REQUEST = 100
+
 # Flask settings
 FLASK_HOST = "127.0.0.1"
 FLASK_PORT = 5000
 FLASK_DEBUG = True
 
+# Response cache (Flask-Caching) for cheap, frequently polled endpoints
+# Use "RedisCache" with CACHE_REDIS_URL when running multiple workers
+CACHE_TYPE = os.environ.get("CACHE_TYPE", "SimpleCache")
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "")
+STATS_CACHE_TIMEOUT = 30  # seconds
+INDEX_CACHE_TIMEOUT = 600  # seconds; also invalidated when new stories land, and the ETag time window for feed pages
+INDEX_STREAM_CHUNK_SIZE = 8192  # characters per chunk when streaming an uncached feed page
+SNAPSHOT_MAX_AGE = 60  # seconds; in-memory stats snapshot for polling endpoints
+SNAPSHOT_VERSION_CHECK = 5  # seconds between cheap checks for stories written by other processes
+
+# Response compression (Flask-Compress); levels favour latency over ratio
+COMPRESS_ALGORITHM = ['br', 'gzip']
+COMPRESS_ALGORITHM_STREAMING = ['br', 'gzip']  # streamed first renders of the feed
+COMPRESS_MIN_SIZE = 512  # bytes; smaller bodies are sent as-is
+COMPRESS_LEVEL = 4
+
+# Compiled Jinja template bytecode, reused across restarts
+JINJA_CACHE_DIR = os.path.join(tempfile.gettempdir(), "lucid_jinja_cache")
+
 # =============================================================================
 # DATABASE CONFIG
 # =============================================================================
@@ -154,6 +224,10 @@ if os.path.exists("/data"):
 else:
     DATABASE_PATH = os.path.join(os.path.dirname(__file__), "news_bench.db")
 
+# Local SQLite tuning (ignored for Turso)
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # bytes of the DB file to memory-map for reads
+SQLITE_CACHE_SIZE_KB = 64 * 1024  # page cache per connection
+
 # =============================================================================
 # SCRAPING CONFIG
 # =============================================================================
@@ -168,5 +242,17 @@ USER_AGENT = "Lucid/1.0 (News Aggregator; +https://github.com/lucid)"
 # Delay between requests to same domain (seconds)
 REQUEST_DELAY = 1.0
 
+# Download caps; larger responses are truncated at the cap
+MAX_FEED_BYTES = 5 * 1024 * 1024
+MAX_ARTICLE_BYTES = 2 * 1024 * 1024
+
+# Concurrency: feeds scraped in parallel, and article pages fetched in parallel per feed
+# (requests to any one host are still spaced REQUEST_DELAY apart)
+SCRAPER_MAX_WORKERS = 8
+ARTICLE_FETCH_WORKERS = 4
+
 # Maximum age of articles to scrape (hours)
 MAX_ARTICLE_AGE_HOURS = 120  # 5 days for more comprehensive coverage
+
+# Article text stored per article; the synthesizer never reads past this
+MAX_LEDE_CHARS = 3000
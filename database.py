@@ -7,6 +7,12 @@ Supports both local SQLite and Turso (hosted SQLite) for production.
 
 import sqlite3
 import os
+import orjson
+import threading
+import functools
+import atexit
+import time
+from collections import defaultdict, OrderedDict
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from contextlib import contextmanager
@@ -14,7 +20,10 @@ from contextlib import contextmanager
 # =============================================================================
 # DATABASE CONFIG
 # =============================================================================
-from config import DATABASE_PATH
+from config import (
+    DATABASE_PATH, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB, RELEVANCE_WEIGHT_SOURCES, RELEVANCE_WEIGHT_DIVERSITY,
+    RELEVANCE_WEIGHT_RECENCY, RELEVANCE_BASE_SCORE
+)
 
 # Turso configuration (set these env vars for production)
 TURSO_DATABASE_URL = os.environ.get('TURSO_DATABASE_URL')
@@ -45,8 +54,17 @@ def _get_raw_connection():
     if USE_TURSO:
         return _libsql.connect(database=TURSO_DATABASE_URL, auth_token=TURSO_AUTH_TOKEN)
     else:
-        conn = sqlite3.connect(DATABASE_PATH)
+        # A larger statement cache keeps every query below compiled per connection.
+        # Implicit transactions only open for writes, so take the write lock up
+        # front (BEGIN IMMEDIATE) instead of upgrading mid-transaction.
+        conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False, cached_statements=256,
+                               isolation_level='IMMEDIATE')
         conn.execute("PRAGMA foreign_keys = ON")
+        # Per-connection settings; journal_mode=WAL is persistent and set in init_database()
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA cache_size = -{int(SQLITE_CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
         return conn
 
 
@@ -61,9 +79,12 @@ def _row_to_dict(cursor, row):
 
 
 def _fetchall_dicts(cursor):
-    """Fetch all rows as dictionaries."""
+    """Fetch all rows as dictionaries (column names are read once per result set)."""
     rows = cursor.fetchall()
-    return [_row_to_dict(cursor, row) for row in rows]
+    if not rows:
+        return []
+    columns = tuple(col[0] for col in cursor.description)
+    return [dict(zip(columns, row)) for row in rows]
 
 
 def _fetchone_dict(cursor):
@@ -72,26 +93,152 @@ def _fetchone_dict(cursor):
     return _row_to_dict(cursor, row) if row else None
 
 
+# Connections are reused per thread so calls skip the open + pragma setup
+# (and, for Turso, the connection handshake)
+_local = threading.local()
+
+
+def _get_thread_connection():
+    """Get this thread's connection, opening it on first use."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _get_raw_connection()
+        if not USE_TURSO:
+            conn.row_factory = sqlite3.Row
+        _local.conn = conn
+        _local.depth = 0
+    return conn
+
+
+def close_thread_connection():
+    """Close this thread's cached connection, if any."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        _local.conn = None
+        try:
+            conn.close()
+        except:
+            pass
+
+
+def _json_object_sql(columns: List[str]) -> str:
+    """SQL expression building a JSON object from the given column names."""
+    return "json_object(" + ", ".join(f"'{col}', {col}" for col in columns) + ")"
+
+
 @contextmanager
 def get_connection():
     """Context manager for database connections with proper commit/rollback."""
-    conn = _get_raw_connection()
-    if not USE_TURSO:
-        conn.row_factory = sqlite3.Row
+    # Nested blocks share the outer transaction; only the outermost commits
+    conn = _get_thread_connection()
+    _local.depth += 1
     try:
         yield conn
-        conn.commit()
-    except Exception as e:
-        try:
-            conn.rollback()
-        except:
-            pass
+        if _local.depth == 1:
+            conn.commit()
+    except Exception:
+        if _local.depth == 1:
+            try:
+                conn.rollback()
+            except:
+                pass
+            if USE_TURSO:
+                # A failed remote connection may be unusable; reconnect next time
+                close_thread_connection()
         raise
     finally:
-        try:
-            conn.close()
-        except:
-            pass
+        _local.depth -= 1
+
+
+# =============================================================================
+# QUERY RESULT CACHE
+# =============================================================================
+# Short-lived cache for read-heavy queries. Writes made through this module
+# bump a per-table version, which invalidates dependent entries immediately;
+# the TTL bounds staleness from writes made by other processes.
+
+# Bounded LRU: keys include caller-supplied page/limit values
+QUERY_CACHE_MAX_ENTRIES = 256
+_query_cache = OrderedDict()
+_query_cache_lock = threading.Lock()
+_table_versions = {'articles': 0, 'stories': 0}
+
+
+def _bump_table_version(*tables: str):
+    """Invalidate cached query results that depend on the given tables."""
+    with _query_cache_lock:
+        for table in tables:
+            _table_versions[table] += 1
+
+
+def invalidate_query_cache():
+    """Drop every cached result (e.g. once another process is seen to have written)."""
+    with _query_cache_lock:
+        _query_cache.clear()
+        # Results still being computed were read under the old versions; don't let them land
+        for table in _table_versions:
+            _table_versions[table] += 1
+
+
+def _copy_result(value):
+    """Shallow-copy a cached result so callers can mutate what they get back."""
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return [dict(item) if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def cached_query(ttl: float, tables: tuple):
+    """Cache a query function's result per arguments for `ttl` seconds."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with _query_cache_lock:
+                version = tuple(_table_versions[t] for t in tables)
+                entry = _query_cache.get(key)
+                if entry is not None:
+                    if entry[0] > now and entry[1] == version:
+                        _query_cache.move_to_end(key)
+                        return _copy_result(entry[2])
+                    del _query_cache[key]  # expired or invalidated
+
+            value = fn(*args, **kwargs)
+            with _query_cache_lock:
+                _query_cache[key] = (now + ttl, version, value)
+                _query_cache.move_to_end(key)
+                while len(_query_cache) > QUERY_CACHE_MAX_ENTRIES:
+                    _query_cache.popitem(last=False)
+            return _copy_result(value)
+        return wrapper
+    return decorator
+
+
+# =============================================================================
+# HOT-PATH SQL
+# =============================================================================
+# Kept as constants so every call passes the identical string and hits the
+# connection's prepared-statement cache.
+
+_SQL_INSERT_ARTICLE_IGNORE = """
+    INSERT INTO articles (source_name, source_lean, headline, lede, url, published_at, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO NOTHING
+"""
+_SQL_INSERT_ARTICLE = _SQL_INSERT_ARTICLE_IGNORE + "RETURNING id"
+_SQL_UPDATE_EMBEDDING = "UPDATE articles SET embedding = ? WHERE id = ?"
+_SQL_ARTICLE_BY_ID = """
+    SELECT id, source_name, source_lean, headline, lede, url, published_at, created_at
+    FROM articles WHERE id = ?
+"""
+_SQL_UNCLUSTERED_IDS = """
+    SELECT a.id FROM articles a
+    WHERE a.created_at > ? AND a.embedding IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM story_sources ss WHERE ss.article_id = a.id)
+"""
+_SQL_INSERT_STORY_SOURCE = "INSERT OR IGNORE INTO story_sources (story_id, article_id) VALUES (?, ?)"
 
 
 # =============================================================================
@@ -100,13 +247,143 @@ def get_connection():
 
 _initialized = False
 
+def _add_column_if_missing(cursor, table: str, column: str, definition: str) -> bool:
+    """Add a column to an existing table. Returns True if it had to be added."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if any(row[1] == column for row in cursor.fetchall()):
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+def _update_coverage_scores(cursor, story_id: Optional[int] = None):
+    """
+    Recompute the stored, time-independent part of the relevance score
+    (source count + lean diversity) for one story, or all stories.
+    """
+    sql = """
+        UPDATE stories SET coverage_score =
+            ? * (SELECT COUNT(*) FROM story_sources ss WHERE ss.story_id = stories.id)
+          + ? * (SELECT COUNT(DISTINCT a.source_lean) FROM story_sources ss
+                 JOIN articles a ON a.id = ss.article_id WHERE ss.story_id = stories.id)
+    """
+    params = [RELEVANCE_WEIGHT_SOURCES, RELEVANCE_WEIGHT_DIVERSITY]
+    if story_id is not None:
+        sql += " WHERE id = ?"
+        params.append(story_id)
+    cursor.execute(sql, params)
+
+
+# On-disk embedding format, recorded in meta under 'embedding_format'
+# (0 = pickled numpy array, 1 = raw float32 bytes, 2 = float32 scale + int8 values,
+#  3 = same layout with the scale chosen so vectors decode to unit length;
+#  see clusterer.embedding_to_bytes)
+EMBEDDING_FORMAT = 3
+
+# Bump whenever init_database gains new tables, columns, triggers or indexes;
+# databases already at this version skip the DDL on startup
+SCHEMA_VERSION = 3
+
+
+def _schema_is_current(cursor) -> bool:
+    """True if the database was already initialized by this version of the code."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'")
+    if cursor.fetchone() is None:
+        return False
+    cursor.execute("SELECT key, value FROM meta WHERE key IN ('schema_version', 'embedding_format')")
+    versions = {row[0]: row[1] for row in cursor.fetchall()}
+    return (versions.get('schema_version', 0) >= SCHEMA_VERSION
+            and versions.get('embedding_format', 0) >= EMBEDDING_FORMAT)
+
+
+def _migrate_embedding_blobs(cursor):
+    """One-shot rewrite of embedding blobs from older formats into the current one."""
+    cursor.execute("SELECT value FROM meta WHERE key = 'embedding_format'")
+    row = cursor.fetchone()
+    old_format = row[0] if row is not None else 0
+    if old_format >= EMBEDDING_FORMAT:
+        return
+
+    cursor.execute("SELECT id, embedding FROM articles WHERE embedding IS NOT NULL")
+    rows = cursor.fetchall()
+    if rows:
+        import pickle
+        import numpy as np
+        from clusterer import embedding_to_bytes
+        updates = []
+        for article_id, blob in rows:
+            try:
+                if old_format == 0:
+                    vector = np.asarray(pickle.loads(blob), dtype=np.float32)
+                elif old_format == 1:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                else:
+                    vector = np.frombuffer(blob, dtype=np.int8, offset=4).astype(np.float32)
+                data = embedding_to_bytes(vector)
+            except Exception:
+                data = None  # Unreadable - gets re-embedded on the next run
+            updates.append((data, article_id))
+        cursor.executemany(_SQL_UPDATE_EMBEDDING, updates)
+        print(f"[DATABASE] Converted {len(updates)} embeddings to normalized int8")
+
+    cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('embedding_format', ?)",
+                   (EMBEDDING_FORMAT,))
+
+
+def group_sources_by_lean(sources: list) -> dict:
+    """Group source articles by political lean."""
+    grouped = {'left': [], 'center': [], 'right': [], 'international': []}
+    for source in sources:
+        lean = source.get('source_lean', 'center')
+        if lean in grouped:
+            grouped[lean].append(source)
+        else:
+            grouped['center'].append(source)
+    return grouped
+
+
+def _update_sources_grouped(cursor, story_id: Optional[int] = None):
+    """
+    Store each story's sources grouped by lean as JSON, so feed pages don't
+    need to query sources. Only display fields are kept (no article body).
+    """
+    sql = """
+        SELECT ss.story_id, a.id, a.source_name, a.source_lean, a.headline, a.url, a.published_at
+        FROM story_sources ss
+        JOIN articles a ON a.id = ss.article_id
+    """
+    params = []
+    if story_id is not None:
+        sql += " WHERE ss.story_id = ?"
+        params.append(story_id)
+    cursor.execute(sql + " ORDER BY a.source_lean, a.source_name", params)
+
+    sources_by_story = defaultdict(list)
+    for row in _fetchall_dicts(cursor):
+        sources_by_story[row.pop('story_id')].append(row)
+
+    cursor.executemany(
+        "UPDATE stories SET sources_grouped_json = ? WHERE id = ?",
+        [(orjson.dumps(group_sources_by_lean(sources)).decode(), sid) for sid, sources in sources_by_story.items()]
+    )
+
+
 def init_database():
     """Initialize the database with required tables."""
     global _initialized
     if _initialized:
         return
+    if not USE_TURSO:
+        atexit.register(optimize_database)
     with get_connection() as conn:
         cursor = conn.cursor()
+        if _schema_is_current(cursor):
+            _initialized = True
+            return
+
+        if not USE_TURSO:
+            # WAL lets the web readers keep going while the pipeline writes
+            cursor.execute("PRAGMA journal_mode = WAL")
 
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS articles (
@@ -133,7 +410,10 @@ def init_database():
                 key_differences TEXT,
                 source_count INTEGER DEFAULT 0,
                 created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
+                updated_at TEXT NOT NULL,
+                created_at_epoch INTEGER,
+                coverage_score INTEGER DEFAULT 0,
+                sources_grouped_json TEXT
             )
         """)
 
@@ -148,11 +428,68 @@ def init_database():
             )
         """)
 
+        # LLM synthesis results keyed by a hash of the exact request
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS synthesis_cache (
+                key TEXT PRIMARY KEY,
+                response_json TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+
+        # Row counters kept up to date by triggers, so stats never COUNT(*) a table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        for table in ('articles', 'stories'):
+            cursor.execute(f"INSERT OR IGNORE INTO meta (key, value) SELECT 'total_{table}', COUNT(*) FROM {table}")
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table}
+                BEGIN UPDATE meta SET value = value + 1 WHERE key = 'total_{table}'; END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table}
+                BEGIN UPDATE meta SET value = value - 1 WHERE key = 'total_{table}'; END
+            """)
+
+        # Bumped on every story insert/delete, so each process can notice the others' writes
+        cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('stories_version', 0)")
+        for event in ('INSERT', 'DELETE'):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_stories_version_{event.lower()} AFTER {event} ON stories
+                BEGIN UPDATE meta SET value = value + 1 WHERE key = 'stories_version'; END
+            """)
+
+        # Migrations for databases created before these columns existed
+        if _add_column_if_missing(cursor, 'stories', 'created_at_epoch', 'INTEGER'):
+            cursor.execute("UPDATE stories SET created_at_epoch = CAST(strftime('%s', created_at, 'utc') AS INTEGER)")
+        if _add_column_if_missing(cursor, 'stories', 'coverage_score', 'INTEGER DEFAULT 0'):
+            _update_coverage_scores(cursor)
+        if _add_column_if_missing(cursor, 'stories', 'sources_grouped_json', 'TEXT'):
+            _update_sources_grouped(cursor)
+        _migrate_embedding_blobs(cursor)
+
         # Indexes
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_created ON articles(created_at)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_url ON articles(url)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source_name)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_stories_created ON stories(created_at)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_story_sources_story ON story_sources(story_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_story_sources_article ON story_sources(article_id)")
+        # Partial index for the clustering scan: only embedded articles are candidates
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_articles_unclustered
+            ON articles(created_at DESC) WHERE embedding IS NOT NULL
+        """)
+
+        cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                       (SCHEMA_VERSION,))
+
+        # Give the planner statistics for the indexes just created
+        cursor.execute("ANALYZE")
 
     _initialized = True
     print("[DATABASE] Initialized successfully")
@@ -174,28 +511,51 @@ def insert_article(
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO articles (source_name, source_lean, headline, lede, url, published_at, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (source_name, source_lean, headline, lede, url, published_at, datetime.now().isoformat()))
-            return cursor.lastrowid
-    except Exception as e:
-        error_str = str(e).lower()
-        if 'unique' in error_str or 'constraint' in error_str:
+            cursor.execute(_SQL_INSERT_ARTICLE, (source_name, source_lean, headline, lede, url, published_at, datetime.now().isoformat()))
+            row = cursor.fetchone()
+        if row is None:
             return None  # Duplicate URL, this is expected
+        _bump_table_version('articles')
+        return row[0]
+    except Exception as e:
         print(f"[DATABASE] Error inserting article: {e}")
         return None
 
 
+def insert_articles_bulk(rows: List[tuple]) -> int:
+    """
+    Insert many articles in one transaction. Each row is
+    (source_name, source_lean, headline, lede, url, published_at).
+    Duplicate URLs are skipped. Returns the number of new articles.
+    """
+    if not rows:
+        return 0
+    now = datetime.now().isoformat()
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(_SQL_INSERT_ARTICLE_IGNORE, [row + (now,) for row in rows])
+            inserted = cursor.rowcount
+    except Exception as e:
+        print(f"[DATABASE] Error inserting articles: {e}")
+        return 0
+    if inserted:
+        _bump_table_version('articles')
+    return inserted
+
+
+_SQL_RECENT_ARTICLES = """
+    SELECT id, source_name, source_lean, headline, lede, url, published_at, created_at
+    FROM articles WHERE created_at > ? ORDER BY created_at DESC
+"""
+
+
 def get_recent_articles(hours: int = 48) -> List[Dict]:
     """Get articles from the last N hours."""
     cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, source_name, source_lean, headline, lede, url, published_at, created_at
-            FROM articles WHERE created_at > ? ORDER BY created_at DESC
-        """, (cutoff,))
+        cursor.execute(_SQL_RECENT_ARTICLES, (cutoff,))
         return _fetchall_dicts(cursor)
 
 
@@ -210,33 +570,95 @@ def get_articles_without_embedding(limit: int = 100) -> List[Dict]:
         return _fetchall_dicts(cursor)
 
 
+def iter_articles_without_embedding(batch_size: int = 400, limit: Optional[int] = None,
+                                    lede_chars: int = 500):
+    """
+    Yield batches of articles that still need embeddings, newest first.
+    Pages by id, so memory stays bounded and each page can be written back
+    before the next is read. Only the first `lede_chars` of the lede are loaded.
+    """
+    last_id = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, headline, substr(lede, 1, ?) AS lede FROM articles
+                WHERE embedding IS NULL AND (? IS NULL OR id < ?)
+                ORDER BY id DESC LIMIT ?
+            """, (lede_chars, last_id, last_id, size))
+            rows = _fetchall_dicts(cursor)
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]['id']
+        if remaining is not None:
+            remaining -= len(rows)
+
+
 def update_article_embedding(article_id: int, embedding: bytes):
     """Store embedding for an article."""
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("UPDATE articles SET embedding = ? WHERE id = ?", (embedding, article_id))
+        cursor.execute(_SQL_UPDATE_EMBEDDING, (embedding, article_id))
 
 
-def get_articles_with_embeddings(hours: int = 48) -> List[Dict]:
-    """Get articles with embeddings from the last N hours."""
+def update_article_embeddings_bulk(pairs: List[tuple]):
+    """Store many embeddings in one transaction. `pairs` holds (embedding_bytes, article_id)."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(_SQL_UPDATE_EMBEDDING, pairs)
+
+
+def iter_articles_with_embeddings(hours: int = 48, batch_size: int = 128):
+    """
+    Yield articles with embeddings from the last N hours, newest first.
+    Rows are pulled `batch_size` at a time so callers that filter as they go
+    never hold the whole window (bodies and blobs included) in memory.
+    """
     cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
     with get_connection() as conn:
         cursor = conn.cursor()
+        cursor.arraysize = batch_size
         cursor.execute("""
             SELECT id, source_name, source_lean, headline, lede, url, published_at, created_at, embedding
             FROM articles WHERE created_at > ? AND embedding IS NOT NULL ORDER BY created_at DESC
         """, (cutoff,))
-        return _fetchall_dicts(cursor)
+        columns = tuple(col[0] for col in cursor.description)
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(zip(columns, row))
+
+
+def get_articles_with_embeddings(hours: int = 48) -> List[Dict]:
+    """Get articles with embeddings from the last N hours."""
+    return list(iter_articles_with_embeddings(hours))
+
+
+def get_existing_urls(urls: List[str]) -> set:
+    """Return the subset of `urls` already stored (looked up through the url index)."""
+    existing = set()
+    urls = list(urls)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"SELECT url FROM articles WHERE url IN ({placeholders})", chunk)
+            existing.update(row[0] for row in cursor)
+    return existing
 
 
 def get_article_by_id(article_id: int) -> Optional[Dict]:
     """Get a single article by ID."""
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, source_name, source_lean, headline, lede, url, published_at, created_at
-            FROM articles WHERE id = ?
-        """, (article_id,))
+        cursor.execute(_SQL_ARTICLE_BY_ID, (article_id,))
         return _fetchone_dict(cursor)
 
 
@@ -245,18 +667,35 @@ def get_unclustered_article_ids(hours: int = 48) -> List[int]:
     cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT a.id FROM articles a
-            LEFT JOIN story_sources ss ON a.id = ss.article_id
-            WHERE a.created_at > ? AND ss.id IS NULL AND a.embedding IS NOT NULL
-        """, (cutoff,))
-        return [row[0] for row in cursor.fetchall()]
+        cursor.execute(_SQL_UNCLUSTERED_IDS, (cutoff,))
+        return [row[0] for row in cursor]
 
 
 # =============================================================================
 # STORY OPERATIONS
 # =============================================================================
 
+def _insert_story_row(cursor, story: Dict, now_dt: datetime) -> int:
+    """Insert one story, its source links and its precomputed columns. Returns the story ID."""
+    now = now_dt.isoformat()
+    article_ids = story['article_ids']
+    cursor.execute("""
+        INSERT INTO stories (synthesized_headline, consensus, left_framing, right_framing,
+                             center_framing, key_differences, source_count, created_at, updated_at,
+                             created_at_epoch)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (story['synthesized_headline'], story['consensus'], story['left_framing'], story['right_framing'],
+          story['center_framing'], story['key_differences'], len(article_ids), now, now, int(now_dt.timestamp())))
+
+    story_id = cursor.lastrowid
+
+    cursor.executemany(_SQL_INSERT_STORY_SOURCE, [(story_id, aid) for aid in article_ids])
+
+    _update_coverage_scores(cursor, story_id)
+    _update_sources_grouped(cursor, story_id)
+    return story_id
+
+
 def insert_story(
     synthesized_headline: str,
     consensus: str,
@@ -267,74 +706,110 @@ def insert_story(
     article_ids: List[int]
 ) -> Optional[int]:
     """Insert a new synthesized story with its source articles."""
+    story = {
+        'synthesized_headline': synthesized_headline, 'consensus': consensus,
+        'left_framing': left_framing, 'right_framing': right_framing,
+        'center_framing': center_framing, 'key_differences': key_differences,
+        'article_ids': article_ids
+    }
     try:
         with get_connection() as conn:
-            cursor = conn.cursor()
-            now = datetime.now().isoformat()
-
-            cursor.execute("""
-                INSERT INTO stories (synthesized_headline, consensus, left_framing, right_framing,
-                                     center_framing, key_differences, source_count, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (synthesized_headline, consensus, left_framing, right_framing,
-                  center_framing, key_differences, len(article_ids), now, now))
-
-            story_id = cursor.lastrowid
-
-            for article_id in article_ids:
-                cursor.execute(
-                    "INSERT OR IGNORE INTO story_sources (story_id, article_id) VALUES (?, ?)",
-                    (story_id, article_id)
-                )
-
-            return story_id
+            story_id = _insert_story_row(conn.cursor(), story, datetime.now())
+        _bump_table_version('stories')
+        return story_id
     except Exception as e:
         print(f"[DATABASE] Error inserting story: {e}")
         return None
 
 
+def insert_stories_bulk(stories: List[Dict]) -> List[int]:
+    """
+    Insert many stories (dicts with insert_story's arguments as keys) in one
+    transaction. Returns the new story IDs in order.
+    """
+    if not stories:
+        return []
+    now_dt = datetime.now()
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            story_ids = [_insert_story_row(cursor, story, now_dt) for story in stories]
+    except Exception as e:
+        print(f"[DATABASE] Error inserting stories: {e}")
+        return []
+    _bump_table_version('stories')
+    return story_ids
+
+
+@cached_query(ttl=15, tables=('stories',))
 def get_stories(limit: int = 20, offset: int = 0) -> List[Dict]:
     """Get synthesized stories sorted by recency."""
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, synthesized_headline, consensus, left_framing, right_framing,
-                   center_framing, key_differences, source_count, created_at, updated_at
+                   center_framing, key_differences, source_count, created_at, updated_at, created_at_epoch
             FROM stories ORDER BY created_at DESC LIMIT ? OFFSET ?
         """, (limit, offset))
         return _fetchall_dicts(cursor)
 
 
-def get_story_with_sources(story_id: int) -> Optional[Dict]:
-    """Get a story with all its source articles."""
+@cached_query(ttl=15, tables=('stories',))
+def get_stories_ranked(limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    Get synthesized stories sorted by relevance score (highest first).
+    Coverage is precomputed on insert; only the recency penalty is applied here,
+    so only the requested page of stories is returned.
+    """
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, synthesized_headline, consensus, left_framing, right_framing,
-                   center_framing, key_differences, source_count, created_at, updated_at
+                   center_framing, key_differences, source_count, created_at, updated_at, created_at_epoch,
+                   sources_grouped_json,
+                   MAX(0, MIN(100,
+                       ? + coverage_score
+                       - CAST((strftime('%s', 'now') - created_at_epoch) / 3600.0 * ? AS INTEGER)
+                   )) AS relevance_score
+            FROM stories
+            ORDER BY relevance_score DESC, created_at DESC
+            LIMIT ? OFFSET ?
+        """, (RELEVANCE_BASE_SCORE, RELEVANCE_WEIGHT_RECENCY, limit, offset))
+        return _fetchall_dicts(cursor)
+
+
+def get_story_with_sources(story_id: int) -> Optional[Dict]:
+    """Get a story with all its source articles (one round-trip)."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT id, synthesized_headline, consensus, left_framing, right_framing,
+                   center_framing, key_differences, source_count, created_at, updated_at, created_at_epoch,
+                   (SELECT json_group_array({_json_object_sql(SOURCE_COLUMNS)}) FROM (
+                        SELECT a.id, a.source_name, a.source_lean, a.headline, a.lede, a.url, a.published_at
+                        FROM articles a
+                        JOIN story_sources ss ON a.id = ss.article_id
+                        WHERE ss.story_id = ?
+                        ORDER BY a.source_lean, a.source_name
+                   )) AS sources_json
             FROM stories WHERE id = ?
-        """, (story_id,))
+        """, (story_id, story_id))
         story = _fetchone_dict(cursor)
         if not story:
             return None
-
-        cursor.execute("""
-            SELECT a.id, a.source_name, a.source_lean, a.headline, a.lede, a.url, a.published_at
-            FROM articles a
-            JOIN story_sources ss ON a.id = ss.article_id
-            WHERE ss.story_id = ?
-            ORDER BY a.source_lean, a.source_name
-        """, (story_id,))
-        story['sources'] = _fetchall_dicts(cursor)
+        story['sources'] = orjson.loads(story.pop('sources_json'))
         return story
 
 
+@cached_query(ttl=30, tables=('stories',))
 def get_stories_count() -> int:
     """Get total number of stories."""
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM stories")
-        return cursor.fetchone()[0]
+        # Maintained by the stories insert/delete triggers
+        cursor.execute("SELECT value FROM meta WHERE key = 'total_stories'")
+        row = cursor.fetchone()
+        return row[0] if row else 0
 
 
 def get_sources_for_story(story_id: int) -> List[Dict]:
@@ -351,39 +826,93 @@ def get_sources_for_story(story_id: int) -> List[Dict]:
         return _fetchall_dicts(cursor)
 
 
+SOURCE_COLUMNS = ['id', 'source_name', 'source_lean', 'headline', 'lede', 'url', 'published_at']
+
+
+def get_sources_json_for_stories(story_ids: List[int]) -> Dict[int, str]:
+    """
+    Source articles for many stories in one query, keyed by story ID. Each
+    story's sources come back as a ready-to-send JSON array string built by SQLite.
+    """
+    if not story_ids:
+        return {}
+    placeholders = ",".join("?" * len(story_ids))
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT story_id, json_group_array({_json_object_sql(SOURCE_COLUMNS)}) FROM (
+                SELECT ss.story_id, a.id, a.source_name, a.source_lean, a.headline, a.lede, a.url, a.published_at
+                FROM articles a
+                JOIN story_sources ss ON a.id = ss.article_id
+                WHERE ss.story_id IN ({placeholders})
+                ORDER BY ss.story_id, a.source_lean, a.source_name
+            ) GROUP BY story_id
+        """, list(story_ids))
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+
 # =============================================================================
-# STATS AND MAINTENANCE
+# SYNTHESIS CACHE
 # =============================================================================
 
-def get_stats() -> Dict:
-    """Get database statistics."""
+def get_cached_synthesis(key: str) -> Optional[str]:
+    """Get a stored synthesis (JSON text) by request hash, or None."""
     with get_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute("SELECT response_json FROM synthesis_cache WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row[0] if row else None
 
-        cursor.execute("SELECT COUNT(*) FROM articles")
-        total_articles = cursor.fetchone()[0]
 
-        cursor.execute("SELECT COUNT(*) FROM stories")
-        total_stories = cursor.fetchone()[0]
+def store_synthesis(key: str, response_json: str):
+    """Remember a successful synthesis under its request hash."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO synthesis_cache (key, response_json, created_at) VALUES (?, ?, ?)",
+            (key, response_json, datetime.now().isoformat())
+        )
 
-        cursor.execute("SELECT COUNT(DISTINCT source_name) FROM articles")
-        unique_sources = cursor.fetchone()[0]
 
-        cursor.execute("SELECT MAX(created_at) FROM articles")
-        last_article = cursor.fetchone()[0]
+# =============================================================================
+# STATS AND MAINTENANCE
+# =============================================================================
+
+@cached_query(ttl=30, tables=('articles', 'stories'))
+def get_stats() -> Dict:
+    """Get database statistics."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
 
-        cursor.execute("SELECT MAX(created_at) FROM stories")
-        last_story = cursor.fetchone()[0]
+        # One round trip: counters come from meta, the rest are index-only lookups
+        cursor.execute("""
+            SELECT
+                (SELECT value FROM meta WHERE key = 'total_articles'),
+                (SELECT value FROM meta WHERE key = 'total_stories'),
+                (SELECT COUNT(DISTINCT source_name) FROM articles),
+                (SELECT MAX(created_at) FROM articles),
+                (SELECT MAX(created_at) FROM stories)
+        """)
+        total_articles, total_stories, unique_sources, last_article, last_story = cursor.fetchone()
 
         return {
-            'total_articles': total_articles,
-            'total_stories': total_stories,
+            'total_articles': total_articles or 0,
+            'total_stories': total_stories or 0,
             'unique_sources': unique_sources,
             'last_article_at': last_article,
             'last_story_at': last_story
         }
 
 
+def get_stories_version() -> int:
+    """Counter bumped by every story insert/delete from any process (one primary-key read)."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM meta WHERE key = 'stories_version'")
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+
 def get_articles_added_since(hours: int = 2) -> int:
     """Count articles added in the last N hours."""
     cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
@@ -398,11 +927,13 @@ def has_unclustered_articles() -> bool:
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT COUNT(*) FROM articles a
-            LEFT JOIN story_sources ss ON a.id = ss.article_id
-            WHERE ss.id IS NULL AND a.embedding IS NOT NULL
+            SELECT EXISTS (
+                SELECT 1 FROM articles a
+                WHERE a.embedding IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM story_sources ss WHERE ss.article_id = a.id)
+            )
         """)
-        return cursor.fetchone()[0] > 0
+        return bool(cursor.fetchone()[0])
 
 
 def cleanup_old_data(days: int = 7):
@@ -413,11 +944,26 @@ def cleanup_old_data(days: int = 7):
         cursor.execute("DELETE FROM stories WHERE created_at < ?", (cutoff,))
         cursor.execute("""
             DELETE FROM articles
-            WHERE created_at < ? AND id NOT IN (SELECT article_id FROM story_sources)
+            WHERE created_at < ?
+              AND NOT EXISTS (SELECT 1 FROM story_sources ss WHERE ss.article_id = articles.id)
         """, (cutoff,))
+        cursor.execute("DELETE FROM synthesis_cache WHERE created_at < ?", (cutoff,))
+    _bump_table_version('articles', 'stories')
+    optimize_database()
     print(f"[DATABASE] Cleaned up data older than {days} days")
 
 
+def optimize_database():
+    """Refresh planner statistics for tables whose row counts have shifted (local SQLite only)."""
+    if USE_TURSO:
+        return
+    try:
+        with get_connection() as conn:
+            conn.execute("PRAGMA optimize")
+    except Exception as e:
+        print(f"[DATABASE] PRAGMA optimize failed: {e}")
+
+
 if __name__ == "__main__":
     init_database()
     print(get_stats())
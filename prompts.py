@@ -20,13 +20,14 @@ TIPS FOR OPTIMIZATION:
 # OUTPUT: JSON object with headline, consensus, framing analysis, and key differences
 #
 # TOKENS: This prompt + articles typically uses 2000-8000 tokens depending on cluster size
+#
+# LAYOUT: The instructions are static and always come first (sent as the system
+#         message); the articles are the only varying part and come last. Keep it
+#         that way so provider prefix caches can reuse the instruction tokens.
 # =============================================================================
 
-SYNTHESIS_PROMPT = """You are a senior news editor writing a comprehensive briefing on a breaking story.
-Synthesize these articles from multiple sources into a complete news summary.
-
-Articles:
-{articles}
+SYNTHESIS_SYSTEM_PROMPT = """You are a senior news editor writing a comprehensive briefing on a breaking story.
+Synthesize the articles from multiple sources given at the end into a complete news summary.
 
 Return a valid JSON object with the following fields:
 
@@ -70,6 +71,34 @@ Return a valid JSON object with the following fields:
 
 Output ONLY the JSON object. No preamble or explanation."""
 
+SYNTHESIS_USER_PROMPT = """Articles to synthesize:
+{articles}"""
+
+# Batched form: several independent clusters answered in one request
+SYNTHESIS_BATCH_USER_PROMPT = """Synthesize each of the {count} clusters below separately.
+Return a JSON object {{"syntheses": [...]}} holding exactly {count} objects, in cluster order,
+each with the fields described above.
+
+{clusters}"""
+
+SYNTHESIS_BATCH_CLUSTER = """=== CLUSTER {number} ===
+{articles}"""
+
+# JSON schema of the synthesis output, for providers with structured-output modes
+SYNTHESIS_FIELDS = ["headline", "consensus", "left_framing", "right_framing", "center_framing", "key_differences"]
+SYNTHESIS_SCHEMA = {
+    "type": "object",
+    "properties": {field: {"type": "string"} for field in SYNTHESIS_FIELDS},
+    "required": SYNTHESIS_FIELDS,
+    "additionalProperties": False
+}
+SYNTHESIS_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {"syntheses": {"type": "array", "items": SYNTHESIS_SCHEMA}},
+    "required": ["syntheses"],
+    "additionalProperties": False
+}
+
 
 # =============================================================================
 # FUTURE PROMPTS CAN GO HERE
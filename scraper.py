@@ -1,23 +1,28 @@
 """
 Lucid - RSS Scraper (Upgraded)
 ==============================
-Scrapes RSS feeds and extracts FULL article text using Newspaper3k.
+Scrapes RSS feeds and extracts FULL article text using trafilatura.
 """
 
 import time
+import calendar
+import threading
 import feedparser
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
 from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
 import html
 import re
 
-# New dependency for full text extraction
+# Full text extraction from the HTML we download ourselves
 try:
-    from newspaper import Article
+    import trafilatura
 except ImportError:
-    print("ERROR: newspaper3k not installed. Run: pip install newspaper3k")
+    print("ERROR: trafilatura not installed. Run: pip install trafilatura")
     raise
 
 # =============================================================================
@@ -28,20 +33,38 @@ from config import (
     REQUEST_TIMEOUT,
     USER_AGENT,
     REQUEST_DELAY,
-    MAX_ARTICLE_AGE_HOURS
+    MAX_ARTICLE_AGE_HOURS,
+    SCRAPER_MAX_WORKERS,
+    ARTICLE_FETCH_WORKERS,
+    MAX_FEED_BYTES,
+    MAX_ARTICLE_BYTES,
+    MAX_LEDE_CHARS
 )
 import database
 
+# One pooled session for every feed and article request (keeps TCP/TLS connections alive)
+_session = requests.Session()
+_session.headers['User-Agent'] = USER_AGENT
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=SCRAPER_MAX_WORKERS * ARTICLE_FETCH_WORKERS)
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
+# Per-host politeness: next time a request to each host may start
+_host_next_request_at = {}
+_host_lock = threading.Lock()
+
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
+_TAG_RE = re.compile(r'<[^>]+>')
+
 def clean_text(text: str) -> str:
     """Clean HTML entities and extra whitespace."""
     if not text:
         return ""
     text = html.unescape(text)
-    text = re.sub(r'<[^>]+>', '', text)
+    text = _TAG_RE.sub('', text)
     text = ' '.join(text.split())
     return text.strip()
 
@@ -64,20 +87,55 @@ def parse_date(date_str: str) -> Optional[str]:
             continue
     return None
 
-def is_article_recent(published_at: str, max_age_hours: int = MAX_ARTICLE_AGE_HOURS) -> bool:
-    """Check if article is within acceptable age range."""
+def entry_timestamp(entry, published_at: Optional[str]) -> Optional[float]:
+    """
+    Publication time as a UTC epoch. Uses feedparser's pre-parsed struct_time
+    when present, else the ISO string from parse_date (naive times are UTC).
+    """
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    if parsed:
+        return float(calendar.timegm(parsed))
     if not published_at:
-        return True
+        return None
     try:
-        date_str = published_at.replace('Z', '+00:00')
-        pub_date = datetime.fromisoformat(date_str)
-        if pub_date.tzinfo:
-            from datetime import timezone
-            pub_date = pub_date.astimezone(timezone.utc).replace(tzinfo=None)
-        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
-        return pub_date > cutoff
+        pub_date = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+        if pub_date.tzinfo is None:
+            pub_date = pub_date.replace(tzinfo=timezone.utc)
+        return pub_date.timestamp()
     except (ValueError, TypeError):
-        return True
+        return None
+
+def recency_cutoff(max_age_hours: int = MAX_ARTICLE_AGE_HOURS) -> float:
+    """Oldest acceptable publication time as a UTC epoch."""
+    return time.time() - max_age_hours * 3600
+
+def is_article_recent(published_ts: Optional[float], cutoff_ts: float) -> bool:
+    """Check if article is within acceptable age range (unknown dates pass)."""
+    return published_ts is None or published_ts > cutoff_ts
+
+def wait_for_host(url: str):
+    """Space requests to the same host REQUEST_DELAY apart across all worker threads."""
+    host = urlparse(url).netloc
+    with _host_lock:
+        now = time.monotonic()
+        start_at = max(now, _host_next_request_at.get(host, 0.0))
+        _host_next_request_at[host] = start_at + REQUEST_DELAY
+    if start_at > now:
+        time.sleep(start_at - now)
+
+def download(url: str, max_bytes: int) -> bytes:
+    """GET a URL (politely) and return at most `max_bytes` of the body."""
+    wait_for_host(url)
+    with _session.get(url, timeout=REQUEST_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(65536):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+    return b''.join(chunks)[:max_bytes]
 
 # =============================================================================
 # CONTENT EXTRACTION
@@ -89,13 +147,10 @@ def fetch_full_article_text(url: str, rss_description: str = "") -> str:
     Falls back to RSS description if extraction fails.
     """
     try:
-        # We use newspaper3k to download and parse the article
-        article = Article(url)
-        article.download()
-        article.parse()
-        
-        text = article.text.strip()
-        
+        # Download through the shared session, then extract the main text
+        page = download(url, MAX_ARTICLE_BYTES)
+        text = (trafilatura.extract(page, include_comments=False, include_tables=False) or "").strip()
+
         # If scraper returned very little text, it might be a paywall/error
         if len(text) < 200:
             return clean_text(rss_description)
@@ -112,10 +167,7 @@ def fetch_full_article_text(url: str, rss_description: str = "") -> str:
 def fetch_feed(url: str) -> Optional[feedparser.FeedParserDict]:
     """Fetch and parse an RSS feed."""
     try:
-        headers = {'User-Agent': USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        return feedparser.parse(response.content)
+        return feedparser.parse(download(url, MAX_FEED_BYTES))
     except Exception as e:
         print(f"  Error fetching {url}: {e}")
         return None
@@ -131,7 +183,9 @@ def scrape_source(source: Dict) -> int:
     if not feed or not feed.entries:
         return 0
 
-    new_count = 0
+    # Pass 1: pick out the entries worth fetching
+    cutoff_ts = recency_cutoff()
+    candidates = []
     for entry in feed.entries:
         try:
             headline = clean_text(entry.get('title', ''))
@@ -142,46 +196,39 @@ def scrape_source(source: Dict) -> int:
             if not article_url:
                 continue
 
-            # Check if URL exists before doing the heavy scraping work
-            # (Note: You might need a check_if_exists function in database.py 
-            # to avoid scraping body text for articles we already have)
-            
             published_at = parse_date(entry.get('published') or entry.get('updated'))
-            if not is_article_recent(published_at):
+            if not is_article_recent(entry_timestamp(entry, published_at), cutoff_ts):
                 continue
 
             # Extract RSS summary as backup
             rss_summary = (entry.get('summary') or entry.get('description') or '')
-
-            # --- KEY CHANGE: Fetch Full Text ---
-            # This slows down scraping but vastly improves analysis quality
-            full_text = fetch_full_article_text(article_url, rss_summary)
-            
-            # Truncate if absolutely massive to save DB space/LLM tokens
-            # Keep more text for deeper analysis
-            if len(full_text) > 12000:
-                full_text = full_text[:12000] + "..."
-
-            # Insert into database (We use the full text as the 'lede' now, or add a body column)
-            # For backward compatibility with your DB, we store it in 'lede'
-            article_id = database.insert_article(
-                source_name=name,
-                source_lean=lean,
-                headline=headline,
-                lede=full_text, 
-                url=article_url,
-                published_at=published_at
-            )
-
-            if article_id:
-                new_count += 1
-                # Politeness delay between articles from same source
-                time.sleep(0.5) 
+            candidates.append((headline, article_url, published_at, rss_summary))
 
         except Exception as e:
             print(f"  Error processing entry: {e}")
             continue
 
+    # Skip URLs we already have before doing the heavy scraping work
+    existing = database.get_existing_urls(c[1] for c in candidates)
+    candidates = [c for c in candidates if c[1] not in existing]
+
+    # Pass 2: fetch full text concurrently (per-host spacing is enforced in wait_for_host)
+    # This slows down scraping but vastly improves analysis quality
+    with ThreadPoolExecutor(max_workers=ARTICLE_FETCH_WORKERS) as executor:
+        texts = list(executor.map(lambda c: fetch_full_article_text(c[1], c[3]), candidates))
+
+    # Pass 3: store the whole feed in one transaction
+    rows = []
+    for (headline, article_url, published_at, _), full_text in zip(candidates, texts):
+        # Keep only as much text as synthesis will ever use
+        if len(full_text) > MAX_LEDE_CHARS:
+            full_text = full_text[:MAX_LEDE_CHARS] + "..."
+
+        # We use the full text as the 'lede' for backward compatibility with the DB
+        rows.append((name, lean, headline, full_text, article_url, published_at))
+
+    new_count = database.insert_articles_bulk(rows)
+
     print(f"  Added {new_count} new articles from {name}")
     return new_count
 
@@ -195,14 +242,20 @@ def scrape_all_sources() -> Dict[str, int]:
     results = {}
     total_new = 0
 
-    for source in NEWS_SOURCES:
+    def scrape_safely(source: Dict) -> int:
         try:
-            count = scrape_source(source)
-            results[source['name']] = count
-            total_new += count
-            time.sleep(REQUEST_DELAY)
+            return scrape_source(source)
         except Exception as e:
             print(f"Error scraping {source['name']}: {e}")
+            return 0
+
+    # Feeds are independent and I/O-bound, so scrape them side by side
+    with ThreadPoolExecutor(max_workers=SCRAPER_MAX_WORKERS) as executor:
+        counts = list(executor.map(scrape_safely, NEWS_SOURCES))
+
+    for source, count in zip(NEWS_SOURCES, counts):
+        results[source['name']] = count
+        total_new += count
 
     print(f"\nScrape complete! Added {total_new} new articles.")
     return results
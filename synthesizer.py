@@ -5,9 +5,19 @@ Uses LLMs with JSON-enforcement for reliable story generation.
 """
 
 import time
-import json
+import orjson
 import re
+import random
+import hashlib
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
 from typing import List, Dict, Optional
+import numpy as np
 
 # =============================================================================
 # SYNTHESIS CONFIG
@@ -17,30 +27,160 @@ from config import (
     LLM_PROVIDER,
     GROQ_API_KEY,
     TOGETHER_API_KEY,
+    ANTHROPIC_API_KEY,
     OLLAMA_HOST,
     MAX_TOKENS,
+    LLM_JSON_SCHEMA,
+    LLM_STREAM,
     TEMPERATURE,
     LLM_MAX_RETRIES,
-    LLM_RETRY_DELAY
+    LLM_RETRY_DELAY,
+    LLM_MAX_RETRY_DELAY,
+    MAX_LEDE_CHARS,
+    MAX_PROMPT_TOKENS,
+    NEAR_DUPLICATE_THRESHOLD,
+    EMBEDDING_DIM,
+    SYNTHESIS_MAX_WORKERS,
+    SYNTHESIS_BATCH_SIZE,
+    REQUIRE_CROSS_LEAN,
+    VERBOSE,
+    LLM_REQUESTS_PER_MINUTE
+)
+from prompts import (
+    SYNTHESIS_SYSTEM_PROMPT,
+    SYNTHESIS_USER_PROMPT,
+    SYNTHESIS_FIELDS,
+    SYNTHESIS_SCHEMA,
+    SYNTHESIS_BATCH_USER_PROMPT,
+    SYNTHESIS_BATCH_CLUSTER,
+    SYNTHESIS_BATCH_SCHEMA
 )
-from prompts import SYNTHESIS_PROMPT
 import database
 import clusterer
 
-def format_articles_for_prompt(articles: List[Dict]) -> str:
-    """Format articles for inclusion in the LLM prompt."""
+# Optional: progress bar for a synthesis run
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# Optional: exact token counts for the prompt budget (falls back to ~4 chars/token)
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+CHARS_PER_TOKEN = 4
+
+# Cross-article dedup: long sentences already carried verbatim by this many
+# earlier sources in the cluster are replaced with a back-reference
+DEDUP_MIN_SENTENCE_CHARS = 60
+DEDUP_MIN_PRIOR_SOURCES = 2
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])(\s+)')
+
+def dedupe_article_bodies(articles: List[Dict]) -> List[str]:
+    """
+    Return each article's lede with sentences repeated across the cluster
+    (wire copy, newsletter boilerplate) replaced by "[repeats SOURCE]".
+    """
+    seen = {}  # sentence -> sources that already carried it
+    bodies = []
+    for article in articles:
+        source = article['source_name']
+        # Alternating [sentence, whitespace, sentence, ...]; whitespace is kept as-is
+        parts = _SENTENCE_SPLIT_RE.split(article.get('lede', ''))
+        new_sentences = []
+        in_repeat = False
+        for i in range(0, len(parts), 2):
+            sentence = parts[i]
+            prior = seen.get(sentence, ()) if len(sentence) >= DEDUP_MIN_SENTENCE_CHARS else ()
+            if len(prior) >= DEDUP_MIN_PRIOR_SOURCES:
+                if in_repeat:
+                    # Collapse runs of repeated sentences into one marker
+                    parts[i - 1] = parts[i] = ""
+                else:
+                    parts[i] = f"[repeats {prior[0]}]"
+                in_repeat = True
+                continue
+            in_repeat = False
+            if len(sentence) >= DEDUP_MIN_SENTENCE_CHARS:
+                new_sentences.append(sentence)
+        for sentence in new_sentences:
+            sources = seen.setdefault(sentence, [])
+            if source not in sources:
+                sources.append(source)
+        bodies.append("".join(parts))
+    return bodies
+
+def _fair_shares(sizes: List[int], budget: int) -> List[int]:
+    """Split `budget` across items: short ones keep everything, the rest share what's left equally."""
+    shares = [0] * len(sizes)
+    remaining = budget
+    order = sorted(range(len(sizes)), key=sizes.__getitem__)
+    for n, i in enumerate(order):
+        shares[i] = min(sizes[i], remaining // (len(sizes) - n))
+        remaining -= shares[i]
+    return shares
+
+def fit_to_token_budget(bodies: List[str], budget: int = MAX_PROMPT_TOKENS) -> List[str]:
+    """Truncate article bodies so together they stay within `budget` tokens."""
+    if _encoding is not None:
+        tokens = [_encoding.encode(body) for body in bodies]
+        if sum(map(len, tokens)) <= budget:
+            return bodies
+        shares = _fair_shares([len(t) for t in tokens], budget)
+        return [body if share == len(t) else _encoding.decode(t[:share])
+                for body, t, share in zip(bodies, tokens, shares)]
+
+    if sum(map(len, bodies)) <= budget * CHARS_PER_TOKEN:
+        return bodies
+    shares = _fair_shares([len(body) for body in bodies], budget * CHARS_PER_TOKEN)
+    return [body[:share] for body, share in zip(bodies, shares)]
+
+def drop_near_duplicates(articles: List[Dict], threshold: float = NEAR_DUPLICATE_THRESHOLD) -> List[Dict]:
+    """
+    Keep the first of any same-lean articles whose embeddings are nearly
+    identical (wire reprints). Reprints in different leans are all kept, since
+    each one is that lean's coverage. Articles without a usable embedding are
+    always kept.
+    """
+    blob_size = 4 + EMBEDDING_DIM
+    indexed = [i for i, a in enumerate(articles) if len(a.get('embedding') or b'') == blob_size]
+    if len(indexed) < 2:
+        return articles
+
+    # Stored embeddings are unit length, so the Gram matrix is cosine similarity
+    matrix = clusterer.blobs_to_matrix([articles[i]['embedding'] for i in indexed])
+    similarity = matrix @ matrix.T
+    leans = [articles[i]['source_lean'] for i in indexed]
+    dropped = set()
+    for row, i in enumerate(indexed):
+        if i in dropped:
+            continue
+        for col in np.flatnonzero(similarity[row, row + 1:] >= threshold) + row + 1:
+            if leans[col] == leans[row]:
+                dropped.add(indexed[col])
+    return [a for i, a in enumerate(articles) if i not in dropped]
+
+def _format_articles(articles: List[Dict]) -> str:
     formatted = []
+    # Near-identical reprints add tokens but no framing; the story still links them all
+    articles = drop_near_duplicates(articles)
     # Dynamically adjust preview length based on cluster size
     # Smaller clusters get more text per article
     if len(articles) <= 4:
-        preview_length = 3000
+        preview_length = MAX_LEDE_CHARS
     elif len(articles) <= 8:
         preview_length = 2000
     else:
         preview_length = 1500
 
-    for article in articles:
-        body_preview = article.get('lede', '')[:preview_length]
+    # Dedup before truncating: in the 2000/1500 tiers the space freed by
+    # repeated sentences is filled with later, new text. Stored ledes already
+    # end at MAX_LEDE_CHARS, so for small clusters dedup only shortens the prompt.
+    # The cluster as a whole is then capped at MAX_PROMPT_TOKENS
+    bodies = fit_to_token_budget([body[:preview_length] for body in dedupe_article_bodies(articles)])
+    for article, body_preview in zip(articles, bodies):
         formatted.append(f"""
 [SOURCE: {article['source_name']} | LEAN: {article['source_lean']}]
 Headline: {article['headline']}
@@ -48,104 +188,351 @@ Content: {body_preview}
 ---""")
     return "\n".join(formatted)
 
+# Formatted prompts by article-ID sequence (stored articles never change), LRU-evicted
+PROMPT_CACHE_SIZE = 1024
+_prompt_cache = OrderedDict()
+_prompt_cache_lock = threading.Lock()
+
+def format_articles_for_prompt(articles: List[Dict]) -> str:
+    """Format articles for inclusion in the LLM prompt."""
+    key = tuple(a.get('id') for a in articles)
+    if None in key:
+        return _format_articles(articles)
+
+    with _prompt_cache_lock:
+        text = _prompt_cache.get(key)
+        if text is not None:
+            _prompt_cache.move_to_end(key)
+            return text
+
+    text = _format_articles(articles)
+    with _prompt_cache_lock:
+        _prompt_cache[key] = text
+        if len(_prompt_cache) > PROMPT_CACHE_SIZE:
+            _prompt_cache.popitem(last=False)
+    return text
+
 # =============================================================================
 # LLM PROVIDERS
 # =============================================================================
 
-def call_ollama(prompt: str) -> Optional[str]:
-    import requests
+# One pooled session for all provider calls (reuses TCP/TLS connections)
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SYNTHESIS_MAX_WORKERS * 2)
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
+_llm_rate_lock = threading.Lock()
+_llm_next_request_at = 0.0
+
+def _wait_for_llm_slot():
+    """Space LLM request starts to stay under LLM_REQUESTS_PER_MINUTE across all worker threads."""
+    global _llm_next_request_at
+    if LLM_REQUESTS_PER_MINUTE <= 0:
+        return
+    with _llm_rate_lock:
+        now = time.monotonic()
+        start_at = max(now, _llm_next_request_at)
+        _llm_next_request_at = start_at + 60.0 / LLM_REQUESTS_PER_MINUTE
+    if start_at > now:
+        time.sleep(start_at - now)
+
+class RateLimited(Exception):
+    """Provider asked us to slow down (HTTP 429/503)."""
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__("rate limited" if retry_after is None else f"rate limited (retry after {retry_after:.0f}s)")
+        self.retry_after = retry_after
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _check_rate_limit(response):
+    """Raise RateLimited (with the server's Retry-After) on 429/503 responses."""
+    if response.status_code in (429, 503):
+        raise RateLimited(_parse_retry_after(response.headers.get('Retry-After')))
+
+def _response_format(schema: Dict) -> Dict:
+    """OpenAI-style response_format: strict schema when enabled, else plain JSON mode."""
+    if LLM_JSON_SCHEMA:
+        return {"type": "json_schema",
+                "json_schema": {"name": "synthesis", "strict": True, "schema": schema}}
+    return {"type": "json_object"}
+
+def _chat_messages(prompt: str, system: Optional[str]) -> List[Dict]:
+    """Static instructions first as the system message, varying content last."""
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+def _stream_option() -> Dict:
+    return {"stream": True} if LLM_STREAM else {}
+
+class _JsonScanner:
+    """
+    Accumulates streamed text and tracks bracket depth (outside strings) so the
+    reader knows when the first top-level JSON value is complete.
+    """
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.start = None
+        self.end = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        """Add a chunk; returns True once the top-level object/array has closed."""
+        offset = self.size
+        self.parts.append(text)
+        self.size += len(text)
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.start is not None
+            elif ch in '{[':
+                if self.start is None:
+                    self.start = offset + i
+                self.depth += 1
+            elif ch in '}]' and self.start is not None:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.end = offset + i + 1
+                    return True
+        return False
+
+    def text(self) -> str:
+        """The complete JSON value if one closed, else everything received."""
+        full = ''.join(self.parts)
+        return full[self.start:self.end] if self.end is not None else full
+
+def _openai_delta(event: Dict) -> Optional[str]:
+    choices = event.get('choices') or [{}]
+    return (choices[0].get('delta') or {}).get('content')
+
+def _anthropic_delta(event: Dict) -> Optional[str]:
+    return event.get('delta', {}).get('text') if event.get('type') == 'content_block_delta' else None
+
+def _ollama_delta(event: Dict) -> Optional[str]:
+    return event.get('response')
+
+def _collect_stream(response, delta_of) -> str:
+    """
+    Read a streamed completion (SSE or NDJSON) until its JSON value closes, then
+    hang up instead of waiting for trailing tokens.
+    """
+    response.raise_for_status()
+    scanner = _JsonScanner()
     try:
-        response = requests.post(
+        for line in response.iter_lines():
+            if line.startswith(b'data:'):
+                line = line[5:].strip()
+            if not line.startswith(b'{'):
+                continue  # blank keep-alives, "event:" lines, [DONE]
+            text = delta_of(orjson.loads(line))
+            if text and scanner.feed(text):
+                break
+    finally:
+        response.close()
+    return scanner.text()
+
+def call_ollama(prompt: str, system: Optional[str] = None, max_tokens: int = MAX_TOKENS,
+                schema: Dict = SYNTHESIS_SCHEMA) -> Optional[str]:
+    try:
+        response = _session.post(
             f"{OLLAMA_HOST}/api/generate",
             json={
                 "model": LLM_MODEL,
+                "system": system or "",
                 "prompt": prompt,
-                "stream": False,
-                "format": "json",  # OLLAMA NATIVE JSON MODE
+                "stream": LLM_STREAM,
+                "format": schema if LLM_JSON_SCHEMA else "json",  # OLLAMA NATIVE JSON MODE
                 "options": {
                     "temperature": TEMPERATURE,
-                    "num_predict": MAX_TOKENS
+                    "num_predict": max_tokens
                 }
             },
-            timeout=120
+            timeout=120,
+            stream=LLM_STREAM
         )
+        _check_rate_limit(response)
+        if LLM_STREAM:
+            return _collect_stream(response, _ollama_delta)
         response.raise_for_status()
-        return response.json().get('response', '')
+        return orjson.loads(response.content).get('response', '')
+    except RateLimited:
+        raise
     except Exception as e:
         print(f"Ollama error: {e}")
         return None
 
-def call_groq(prompt: str) -> Optional[str]:
-    import requests
+def call_groq(prompt: str, system: Optional[str] = None, max_tokens: int = MAX_TOKENS,
+              schema: Dict = SYNTHESIS_SCHEMA) -> Optional[str]:
     if not GROQ_API_KEY: return None
     try:
-        response = requests.post(
+        response = _session.post(
             "https://api.groq.com/openai/v1/chat/completions",
             headers={"Authorization": f"Bearer {GROQ_API_KEY}"},
             json={
                 "model": LLM_MODEL,
-                "messages": [{"role": "user", "content": prompt}],
-                "response_format": {"type": "json_object"}, # GROQ JSON MODE
+                "messages": _chat_messages(prompt, system),
+                "response_format": _response_format(schema), # GROQ JSON MODE
                 "temperature": TEMPERATURE,
-                "max_tokens": MAX_TOKENS
+                "max_tokens": max_tokens,
+                **_stream_option()
             },
-            timeout=60
+            timeout=60,
+            stream=LLM_STREAM
         )
-        return response.json()['choices'][0]['message']['content']
+        _check_rate_limit(response)
+        if LLM_STREAM:
+            return _collect_stream(response, _openai_delta)
+        return orjson.loads(response.content)['choices'][0]['message']['content']
+    except RateLimited:
+        raise
     except Exception as e:
         print(f"Groq error: {e}")
         return None
 
-def call_together(prompt: str) -> Optional[str]:
-    import requests
+def call_together(prompt: str, system: Optional[str] = None, max_tokens: int = MAX_TOKENS,
+                  schema: Dict = SYNTHESIS_SCHEMA) -> Optional[str]:
     if not TOGETHER_API_KEY: return None
     try:
-        response = requests.post(
+        response = _session.post(
             "https://api.together.xyz/v1/chat/completions",
             headers={"Authorization": f"Bearer {TOGETHER_API_KEY}"},
             json={
                 "model": LLM_MODEL,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": _chat_messages(prompt, system),
+                **({"response_format": _response_format(schema)} if LLM_JSON_SCHEMA else {}),
                 "temperature": TEMPERATURE,
-                "max_tokens": MAX_TOKENS
+                "max_tokens": max_tokens,
+                **_stream_option()
             },
-            timeout=60
+            timeout=60,
+            stream=LLM_STREAM
         )
-        return response.json()['choices'][0]['message']['content']
+        _check_rate_limit(response)
+        if LLM_STREAM:
+            return _collect_stream(response, _openai_delta)
+        return orjson.loads(response.content)['choices'][0]['message']['content']
+    except RateLimited:
+        raise
     except Exception as e:
         print(f"Together error: {e}")
         return None
 
-def call_llm(prompt: str) -> Optional[str]:
-    providers = {"ollama": call_ollama, "groq": call_groq, "together": call_together}
+def call_anthropic(prompt: str, system: Optional[str] = None, max_tokens: int = MAX_TOKENS,
+                   schema: Dict = SYNTHESIS_SCHEMA) -> Optional[str]:
+    if not ANTHROPIC_API_KEY: return None
+    payload = {
+        "model": LLM_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": TEMPERATURE,
+        "max_tokens": max_tokens,
+        **_stream_option()
+    }
+    if system:
+        # Cache breakpoint after the static instructions; later calls reuse them at a discount
+        payload["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+    try:
+        response = _session.post(
+            "https://api.anthropic.com/v1/messages",
+            headers={"x-api-key": ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01"},
+            json=payload,
+            timeout=60,
+            stream=LLM_STREAM
+        )
+        _check_rate_limit(response)
+        if LLM_STREAM:
+            return _collect_stream(response, _anthropic_delta)
+        return orjson.loads(response.content)['content'][0]['text']
+    except RateLimited:
+        raise
+    except Exception as e:
+        print(f"Anthropic error: {e}")
+        return None
+
+def call_llm(prompt: str, system: Optional[str] = None, **options) -> Optional[str]:
+    """Call the configured provider with retries. `options` (max_tokens, schema) pass through."""
+    providers = {"ollama": call_ollama, "groq": call_groq, "together": call_together,
+                 "anthropic": call_anthropic}
     func = providers.get(LLM_PROVIDER)
     if not func: return None
 
     for attempt in range(LLM_MAX_RETRIES):
-        result = func(prompt)
+        retry_after = 0.0
+        _wait_for_llm_slot()
+        try:
+            result = func(prompt, system, **options)
+        except RateLimited as e:
+            print(f"  LLM {e}")
+            result, retry_after = None, e.retry_after or 0.0
         if result: return result
-        time.sleep(LLM_RETRY_DELAY)
+        if attempt < LLM_MAX_RETRIES - 1:
+            # Exponential backoff with jitter so parallel workers don't retry in lockstep
+            backoff = min(LLM_MAX_RETRY_DELAY, LLM_RETRY_DELAY * 2 ** attempt) + random.uniform(0, 1)
+            time.sleep(max(backoff, retry_after))
     return None
 
 # =============================================================================
 # RESPONSE PARSING
 # =============================================================================
 
+# Content between ```json and ```
+_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
 def clean_json_response(response: str) -> str:
     """Removes Markdown code blocks if the LLM adds them."""
+    if response.lstrip().startswith("{"):
+        return response  # JSON/schema mode output needs no cleanup
     if "```" in response:
-        # Regex to extract content between ```json and ```
-        match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", response, re.DOTALL)
+        match = _JSON_BLOCK_RE.search(response)
         if match:
             return match.group(1)
     return response
 
+_DEFAULT_SYNTHESIS = {
+    'headline': '', 'consensus': '', 'left_framing': '', 
+    'right_framing': '', 'center_framing': '', 'key_differences': ''
+}
+
+def synthesis_error(data) -> Optional[str]:
+    """Why `data` is not a valid synthesis (every field a string; extra keys ignored), or None."""
+    if not isinstance(data, dict):
+        return f"expected an object, got {type(data).__name__}"
+    for field in SYNTHESIS_FIELDS:
+        if not isinstance(data.get(field), str):
+            return f"'{field}' missing or not a string"
+    return None
+
+def _validated(data) -> Dict:
+    """Known fields of a valid synthesis, else the empty default."""
+    error = synthesis_error(data)
+    if error:
+        print(f"  Invalid synthesis from LLM: {error}")
+        return dict(_DEFAULT_SYNTHESIS)
+    return {field: data[field] for field in SYNTHESIS_FIELDS}
+
 def parse_synthesis_response(response: str) -> Dict:
     """Parse JSON response from LLM."""
-    default_result = {
-        'headline': '', 'consensus': '', 'left_framing': '', 
-        'right_framing': '', 'center_framing': '', 'key_differences': ''
-    }
+    default_result = dict(_DEFAULT_SYNTHESIS)
     
     if not response:
         return default_result
@@ -153,58 +540,158 @@ def parse_synthesis_response(response: str) -> Dict:
     try:
         # Clean potential markdown
         clean_res = clean_json_response(response)
-        data = json.loads(clean_res)
+        data = orjson.loads(clean_res)
         
-        # Merge with default to ensure all keys exist
-        return {**default_result, **data}
+        # Reject wrong shapes here rather than storing them
+        return _validated(data)
         
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"  Error parsing JSON from LLM: {e}")
         print(f"  Raw response: {response[:100]}...")
         return default_result
 
+def parse_batch_synthesis_response(response: Optional[str], count: int) -> List[Dict]:
+    """
+    Parse a batched answer ({"syntheses": [...]} or a bare array) into exactly
+    `count` syntheses; missing or malformed entries come back empty.
+    """
+    results = []
+    if response:
+        try:
+            data = orjson.loads(clean_json_response(response))
+            items = data.get('syntheses', []) if isinstance(data, dict) else data
+            if isinstance(items, list):
+                results = [_validated(item) for item in items[:count]]
+        except orjson.JSONDecodeError as e:
+            print(f"  Error parsing batched JSON from LLM: {e}")
+    return results + [dict(_DEFAULT_SYNTHESIS) for _ in range(count - len(results))]
+
 # =============================================================================
 # SYNTHESIS PIPELINE
 # =============================================================================
 
-def synthesize_and_store_cluster(articles: List[Dict]) -> Optional[int]:
-    if len(articles) < 2: return None
+# The user prompt split around its one placeholder, so building it is plain concatenation
+_USER_PROMPT_PREFIX, _USER_PROMPT_SUFFIX = SYNTHESIS_USER_PROMPT.split("{articles}")
+
+def user_prompt(articles_text: str) -> str:
+    """SYNTHESIS_USER_PROMPT with the formatted articles filled in."""
+    return _USER_PROMPT_PREFIX + articles_text + _USER_PROMPT_SUFFIX
+
+def synthesis_cache_key(system: str, prompt: str) -> str:
+    """Hash of everything that determines the LLM output for a request."""
+    digest = hashlib.sha256()
+    for part in (LLM_PROVIDER, LLM_MODEL, str(TEMPERATURE), str(MAX_TOKENS), system, prompt):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
 
-    sources = set(a['source_name'] for a in articles)
-    leans = {a['source_lean'] for a in articles}
+def worth_synthesizing(articles: List[Dict]) -> bool:
+    """A cluster needs 2+ articles and, with REQUIRE_CROSS_LEAN, 2+ leans to contrast."""
+    if len(articles) < 2:
+        return False
+    if REQUIRE_CROSS_LEAN and len({a['source_lean'] for a in articles}) < 2:
+        if VERBOSE: print(f"\nSkipping single-lean cluster ({articles[0]['source_lean']}): {articles[0]['headline'][:50]}...")
+        return False
+    return True
+
+def _log_cluster(articles: List[Dict]):
+    if not VERBOSE:
+        return
+    sources, leans = set(), set()
+    for a in articles:
+        sources.add(a['source_name'])
+        leans.add(a['source_lean'])
     print(f"\nSynthesizing cluster with {len(articles)} articles from {len(sources)} sources...")
     print(f"  Sources: {', '.join(sorted(sources))}")
     print(f"  Coverage: {', '.join(sorted(leans))}")
     print(f"  Sample: {articles[0]['headline'][:60]}...")
 
+def _story_row(articles: List[Dict], synthesis: Dict, cache_key: str, cached: bool) -> Optional[Dict]:
+    """Validate a synthesis, remember it in the cache and shape it as a story row."""
+    if not synthesis.get('headline'):
+        print("  Failed to generate valid synthesis")
+        return None
+    if not cached:
+        database.store_synthesis(cache_key, orjson.dumps(synthesis).decode())
+
+    return {
+        'synthesized_headline': synthesis['headline'],
+        'consensus': synthesis['consensus'],
+        'left_framing': synthesis['left_framing'],
+        'right_framing': synthesis['right_framing'],
+        'center_framing': synthesis['center_framing'],
+        'key_differences': synthesis['key_differences'],
+        'article_ids': [a['id'] for a in articles]
+    }
+
+def synthesize_cluster(articles: List[Dict]) -> Optional[Dict]:
+    """Synthesize one cluster. Returns a story row for database.insert_story(_bulk), or None."""
+    if not worth_synthesizing(articles): return None
+    _log_cluster(articles)
+
     # Format articles for prompt
     articles_text = format_articles_for_prompt(articles)
-    prompt = SYNTHESIS_PROMPT.format(articles=articles_text)
+    prompt = user_prompt(articles_text)
+
+    # Identical article sets (same text, same model settings) reuse the earlier result
+    cache_key = synthesis_cache_key(SYNTHESIS_SYSTEM_PROMPT, prompt)
+    cached = database.get_cached_synthesis(cache_key)
+    if cached:
+        if VERBOSE: print("  Using cached synthesis")
+        return _story_row(articles, parse_synthesis_response(cached), cache_key, cached=True)
+    return _synthesize_uncached(articles, prompt, cache_key)
 
-    # Call LLM
-    response = call_llm(prompt)
+def _synthesize_uncached(articles: List[Dict], prompt: str, cache_key: str) -> Optional[Dict]:
+    """LLM call for a cluster that was already filtered, logged and missed in the cache."""
+    # Static instructions go in the system message so they form a cacheable prefix
+    response = call_llm(prompt, system=SYNTHESIS_SYSTEM_PROMPT)
     if not response: return None
 
-    # Parse response
-    synthesis = parse_synthesis_response(response)
-    
-    if not synthesis.get('headline'):
-        print("  Failed to generate valid synthesis")
-        return None
+    return _story_row(articles, parse_synthesis_response(response), cache_key, cached=False)
+
+def synthesize_clusters_batch(clusters: List[List[Dict]]) -> List[Optional[Dict]]:
+    """
+    Synthesize several clusters with one LLM request. Cached clusters are used
+    directly; any cluster the batched answer misses falls back to its own call.
+    """
+    stories = []
+    pending = []  # (articles, articles_text, cache_key)
+    for articles in clusters:
+        if not worth_synthesizing(articles):
+            continue
+        _log_cluster(articles)
+        articles_text = format_articles_for_prompt(articles)
+        # Keyed like a single-cluster request, so either path can reuse the result
+        cache_key = synthesis_cache_key(SYNTHESIS_SYSTEM_PROMPT, user_prompt(articles_text))
+        cached = database.get_cached_synthesis(cache_key)
+        if cached:
+            if VERBOSE: print("  Using cached synthesis")
+            stories.append(_story_row(articles, parse_synthesis_response(cached), cache_key, cached=True))
+        else:
+            pending.append((articles, articles_text, cache_key))
 
-    # Store in database
-    story_id = database.insert_story(
-        synthesized_headline=synthesis['headline'],
-        consensus=synthesis['consensus'],
-        left_framing=synthesis['left_framing'],
-        right_framing=synthesis['right_framing'],
-        center_framing=synthesis['center_framing'],
-        key_differences=synthesis['key_differences'],
-        article_ids=[a['id'] for a in articles]
+    if len(pending) == 1:
+        articles, articles_text, cache_key = pending[0]
+        return stories + [_synthesize_uncached(articles, user_prompt(articles_text), cache_key)]
+    if not pending:
+        return stories
+
+    prompt = SYNTHESIS_BATCH_USER_PROMPT.format(
+        count=len(pending),
+        clusters="\n\n".join(SYNTHESIS_BATCH_CLUSTER.format(number=n, articles=text)
+                              for n, (_, text, _) in enumerate(pending, 1))
     )
+    response = call_llm(prompt, system=SYNTHESIS_SYSTEM_PROMPT,
+                        max_tokens=MAX_TOKENS * len(pending), schema=SYNTHESIS_BATCH_SCHEMA)
+    syntheses = parse_batch_synthesis_response(response, len(pending))
 
-    print(f"  Created story {story_id}: {synthesis['headline'][:50]}...")
-    return story_id
+    for (articles, articles_text, cache_key), synthesis in zip(pending, syntheses):
+        if synthesis.get('headline'):
+            stories.append(_story_row(articles, synthesis, cache_key, cached=False))
+        else:
+            print(f"  Batch missed a cluster; retrying alone: {articles[0]['headline'][:50]}...")
+            stories.append(_synthesize_uncached(articles, user_prompt(articles_text), cache_key))
+    return stories
 
 def run_synthesis(clusters=None) -> List[int]:
     print("\n" + "="*60 + "\nLUCID - JSON Synthesis\n" + "="*60)
@@ -216,12 +703,33 @@ def run_synthesis(clusters=None) -> List[int]:
         print("No clusters to synthesize")
         return []
 
-    story_ids = []
-    for i, cluster in enumerate(clusters):
-        story_id = synthesize_and_store_cluster(cluster)
-        if story_id: story_ids.append(story_id)
-        time.sleep(1)
+    start = time.perf_counter()
+    if SYNTHESIS_BATCH_SIZE > 1:
+        groups = [clusters[i:i + SYNTHESIS_BATCH_SIZE] for i in range(0, len(clusters), SYNTHESIS_BATCH_SIZE)]
+        func = synthesize_clusters_batch
+    else:
+        groups = [[cluster] for cluster in clusters]
+        func = lambda group: [synthesize_cluster(group[0])]
+
+    # LLM calls are network-bound; run independent clusters (or batches of them) side by side
+    # and collect them as they finish (slots keep cluster order for the insert)
+    results = [None] * len(groups)
+    with ThreadPoolExecutor(max_workers=SYNTHESIS_MAX_WORKERS) as executor:
+        futures = {executor.submit(func, group): i for i, group in enumerate(groups)}
+        done = as_completed(futures)
+        if tqdm is not None:
+            done = tqdm(done, total=len(futures), desc="Synthesizing")
+        for future in done:
+            results[futures[future]] = future.result()
+
+    # Store everything in one transaction (syntheses are already in the cache if this fails)
+    stories = [story for group in results for story in group if story]
+    story_ids = database.insert_stories_bulk(stories)
+    if VERBOSE:
+        for story_id, story in zip(story_ids, stories):
+            print(f"  Created story {story_id}: {story['synthesized_headline'][:50]}...")
 
+    print(f"Created {len(story_ids)} stories from {len(clusters)} clusters in {time.perf_counter() - start:.1f}s")
     return story_ids
 
 if __name__ == "__main__":
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+# Never touch the real database from tests (including the atexit PRAGMA optimize)
+database.DATABASE_PATH = os.path.join(tempfile.mkdtemp(prefix="news_bench_tests_"), "news_bench.db")
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """A fresh, initialized SQLite database for this test."""
+    path = str(tmp_path / "news_bench.db")
+    database.close_thread_connection()
+    monkeypatch.setattr(database, 'DATABASE_PATH', path)
+    monkeypatch.setattr(database, '_initialized', False)
+    monkeypatch.setattr(database, '_query_cache', database.OrderedDict())
+    database.init_database()
+    yield path
+    database.close_thread_connection()
@@ -0,0 +1,158 @@
+import gzip
+import sqlite3
+
+import pytest
+
+import app as app_module
+import database
+
+
+@pytest.fixture
+def client(monkeypatch):
+    snapshot = {'last_story_at': '2024-01-01T00:00:00', 'total_articles': 10, 'total_stories': 3, 'etag': 'x'}
+    monkeypatch.setattr(app_module, 'get_snapshot', lambda: snapshot)
+    app_module.cache.clear()
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def db_calls(monkeypatch):
+    """Record feed queries; every story is long enough for Flask-Compress to kick in."""
+    calls = []
+    story = {'id': 1, 'synthesized_headline': 'Headline ' * 80, 'created_at_epoch': 1700000000,
+             'sources_grouped_json': None}
+
+    def get_stories_ranked(limit, offset):
+        calls.append((limit, offset))
+        return [dict(story)]
+
+    monkeypatch.setattr(database, 'get_stories_ranked', get_stories_ranked)
+    monkeypatch.setattr(database, 'get_sources_json_for_stories', lambda ids: {})
+    monkeypatch.setattr(database, 'get_stories_count', lambda: 1)
+    return calls
+
+
+def test_api_stories_304_for_compressed_etag(client, db_calls):
+    first = client.get('/api/stories', headers={'Accept-Encoding': 'br'})
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.endswith(':br"')
+
+    db_calls.clear()
+    second = client.get('/api/stories', headers={'Accept-Encoding': 'br', 'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == etag
+    assert db_calls == []
+
+
+def test_api_stories_304_for_plain_etag(client, db_calls):
+    etag = client.get('/api/stories').headers['ETag']
+    db_calls.clear()
+    assert client.get('/api/stories', headers={'If-None-Match': etag}).status_code == 304
+    assert db_calls == []
+
+
+def test_api_stories_200_for_other_etag(client, db_calls):
+    response = client.get('/api/stories', headers={'Accept-Encoding': 'br', 'If-None-Match': '"other:br"'})
+    assert response.status_code == 200
+    assert db_calls
+
+
+def test_index_304_for_compressed_etag(client, db_calls, monkeypatch):
+    monkeypatch.setattr(database, 'get_stats', lambda: {'total_articles': 10, 'total_stories': 1,
+                                                        'last_story_at': None})
+    first = client.get('/', headers={'Accept-Encoding': 'br'})
+    assert first.status_code == 200
+    first.get_data()  # drain the streamed render
+    etag = first.headers['ETag']
+    assert etag.endswith(':br"')
+
+    # Cache-miss path: the page would be streamed, where Flask-Compress can't answer 304
+    app_module.cache.clear()
+    db_calls.clear()
+    second = client.get('/', headers={'Accept-Encoding': 'br', 'If-None-Match': etag})
+    assert second.status_code == 304
+    assert db_calls == []
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('limit=-1', (1, 0)),
+    ('limit=100000', (100, 0)),
+    ('page=0&limit=5', (5, 0)),
+    ('page=-3', (12, 0)),
+    ('page=3&limit=5', (5, 10)),
+])
+def test_api_stories_clamps_paging(client, db_calls, query, expected):
+    assert client.get(f'/api/stories?{query}').status_code == 200
+    assert db_calls == [expected]
+
+
+def test_feed_etag_changes_with_time_window(client, db_calls, monkeypatch):
+    monkeypatch.setattr(app_module, 'feed_time_bucket', lambda: 1)
+    etag = client.get('/api/stories').headers['ETag']
+    assert client.get('/api/stories', headers={'If-None-Match': etag}).status_code == 304
+
+    # Relative times and recency ordering have moved on, so the old page is stale
+    monkeypatch.setattr(app_module, 'feed_time_bucket', lambda: 2)
+    response = client.get('/api/stories', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def _write_story_from_other_process(path: str, headline: str):
+    other = sqlite3.connect(path)
+    other.execute("""
+        INSERT INTO stories (synthesized_headline, consensus, left_framing, right_framing, center_framing,
+                             key_differences, source_count, created_at, updated_at, created_at_epoch)
+        VALUES (?, 'c', 'l', 'r', 'ce', 'k', 2, '2999-01-01T00:00:00', '2999-01-01T00:00:00',
+                strftime('%s', 'now'))
+    """, (headline,))
+    other.commit()
+    other.close()
+
+
+def test_index_sees_story_written_by_another_process(temp_db, monkeypatch):
+    monkeypatch.setattr(app_module, '_snapshot', None)
+    app_module.cache.clear()
+    client = app_module.app.test_client()
+    a1 = database.insert_article("Src A", "left", "A", "lede", "http://x/a", None)
+    a2 = database.insert_article("Src B", "right", "B", "lede", "http://x/b", None)
+    database.insert_story("First story", "c", "l", "r", "ce", "k", [a1, a2])
+
+    assert b"First story" in client.get('/').get_data()
+
+    # Another process (run.py --synthesize, another worker) adds a story; our
+    # query cache can't see that write and still holds the old ranking
+    _write_story_from_other_process(temp_db, 'Second story')
+
+    # The snapshot's periodic refresh picks the write up
+    monkeypatch.setattr(app_module, '_snapshot_loaded_at', 0.0)
+    body = client.get('/').get_data()
+    assert b"Second story" in body
+
+
+def test_snapshot_version_check_picks_up_other_process_writes(temp_db, monkeypatch):
+    monkeypatch.setattr(app_module, '_snapshot', None)
+    app_module.cache.clear()
+    client = app_module.app.test_client()
+    a1 = database.insert_article("Src A", "left", "A", "lede", "http://x/a", None)
+    a2 = database.insert_article("Src B", "right", "B", "lede", "http://x/b", None)
+    database.insert_story("First story", "c", "l", "r", "ce", "k", [a1, a2])
+    etag = client.get('/api/stories').headers['ETag']
+
+    _write_story_from_other_process(temp_db, 'Second story')
+
+    # Well inside SNAPSHOT_MAX_AGE; only the cheap stories_version check is due
+    monkeypatch.setattr(app_module, '_snapshot_checked_at', 0.0)
+    response = client.get('/api/stories', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'Second story' in [s['synthesized_headline'] for s in response.get_json()['stories']]
+
+
+def test_index_first_render_is_gzipped_for_gzip_only_clients(client, db_calls, monkeypatch):
+    monkeypatch.setattr(database, 'get_stats', lambda: {'total_articles': 10, 'total_stories': 1,
+                                                        'last_story_at': None})
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})  # cache miss: streamed
+    assert response.is_streamed
+    assert response.headers.get('Content-Encoding') == 'gzip'
+    assert b'Headline' in gzip.decompress(response.get_data())
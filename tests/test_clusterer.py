@@ -0,0 +1,25 @@
+import numpy as np
+
+import clusterer
+
+
+def test_small_graphs_skip_numba(monkeypatch):
+    def compiled(*args):
+        raise AssertionError("small graphs should not pay the Numba compile")
+    monkeypatch.setattr(clusterer, '_union_find_roots', compiled)
+    monkeypatch.setattr(clusterer, 'connected_components', None)
+
+    rows, cols = np.array([0, 1, 4]), np.array([1, 2, 5])
+    groups = clusterer.find_connected_groups(6, rows, cols)
+    assert sorted(groups) == [[0, 1, 2], [4, 5]]
+
+
+def test_large_graph_backends_agree(monkeypatch):
+    rng = np.random.default_rng(0)
+    n = clusterer.SMALL_GRAPH_SIZE * 4
+    rows, cols = rng.integers(0, n, 60), rng.integers(0, n, 60)
+    expected = sorted(map(sorted, clusterer.find_connected_groups(n, rows, cols)))
+
+    monkeypatch.setattr(clusterer, 'connected_components', None)
+    monkeypatch.setattr(clusterer, '_union_find_roots', None)
+    assert sorted(map(sorted, clusterer.find_connected_groups(n, rows, cols))) == expected
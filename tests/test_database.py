@@ -0,0 +1,100 @@
+import pytest
+
+import database
+
+
+def test_query_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(database, 'QUERY_CACHE_MAX_ENTRIES', 8)
+    monkeypatch.setattr(database, '_query_cache', database.OrderedDict())
+
+    @database.cached_query(ttl=60, tables=('stories',))
+    def page(n):
+        return [{'page': n}]
+
+    for n in range(100):
+        assert page(n) == [{'page': n}]
+    assert len(database._query_cache) == 8
+
+
+def test_query_cache_drops_invalidated_entries(monkeypatch):
+    monkeypatch.setattr(database, '_query_cache', database.OrderedDict())
+    calls = []
+
+    @database.cached_query(ttl=60, tables=('stories',))
+    def count():
+        calls.append(1)
+        return len(calls)
+
+    assert count() == 1 and count() == 1
+    database._bump_table_version('stories')
+    assert count() == 2
+    assert len(database._query_cache) == 1
+
+
+def test_stories_version_counts_story_writes(temp_db):
+    version = database.get_stories_version()
+    a1 = database.insert_article("Src A", "left", "A", "lede", "http://x/a", None)
+    assert database.get_stories_version() == version
+    database.insert_story("Story", "c", "l", "r", "ce", "k", [a1])
+    assert database.get_stories_version() == version + 1
+
+
+def _legacy_blob(embedding_format: int, vector):
+    import pickle
+    import numpy as np
+    if embedding_format == 0:
+        return pickle.dumps(vector)
+    if embedding_format == 1:
+        return vector.astype(np.float32).tobytes()
+    # Format 2: float32 step followed by int8 values (not renormalized)
+    step = float(np.abs(vector).max()) / 127
+    quantized = np.clip(np.round(vector / step), -127, 127).astype(np.int8)
+    return np.float32(step).tobytes() + quantized.tobytes()
+
+
+@pytest.mark.parametrize('embedding_format', [0, 1, 2])
+def test_init_database_migrates_legacy_embeddings(temp_db, monkeypatch, embedding_format):
+    import numpy as np
+    import clusterer
+    from config import EMBEDDING_DIM
+
+    rng = np.random.default_rng(embedding_format)
+    vectors = {}
+    for i in range(5):
+        vector = (rng.normal(size=EMBEDDING_DIM) * rng.uniform(0.1, 10)).astype(np.float32)
+        article_id = database.insert_article("Src", "left", f"H{i}", "lede", f"http://x/{i}", None)
+        vectors[article_id] = vector
+
+    # Rewind the database to the legacy layout
+    with database.get_connection() as conn:
+        conn.executemany("UPDATE articles SET embedding = ? WHERE id = ?",
+                         [(_legacy_blob(embedding_format, v), aid) for aid, v in vectors.items()])
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'embedding_format'", (embedding_format,))
+        conn.execute("UPDATE meta SET value = 1 WHERE key = 'schema_version'")
+
+    monkeypatch.setattr(database, '_initialized', False)
+    database.init_database()
+
+    def stored():
+        with database.get_connection() as conn:
+            blobs = dict(conn.execute("SELECT id, embedding FROM articles").fetchall())
+            fmt = conn.execute("SELECT value FROM meta WHERE key = 'embedding_format'").fetchone()[0]
+        return blobs, fmt
+
+    blobs, fmt = stored()
+    assert fmt == database.EMBEDDING_FORMAT == 3
+    for article_id, vector in vectors.items():
+        blob = blobs[article_id]
+        assert len(blob) == 4 + EMBEDDING_DIM
+        decoded = clusterer.bytes_to_embedding(blob)
+        assert abs(np.linalg.norm(decoded) - 1) < 1e-3
+        cosine = float(decoded @ vector) / float(np.linalg.norm(vector))
+        assert cosine > 1 - 1e-2
+
+    # A second start-up is a no-op: fast path, no rewrite
+    def fail(cursor):
+        raise AssertionError("migration ran again")
+    monkeypatch.setattr(database, '_migrate_embedding_blobs', fail)
+    monkeypatch.setattr(database, '_initialized', False)
+    database.init_database()
+    assert stored() == (blobs, fmt)
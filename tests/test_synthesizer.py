@@ -0,0 +1,28 @@
+import numpy as np
+
+import clusterer
+import synthesizer
+from config import EMBEDDING_DIM
+
+
+def _embedding(seed: int) -> bytes:
+    vector = np.random.default_rng(seed).normal(size=EMBEDDING_DIM)
+    return clusterer.embedding_to_bytes(vector / np.linalg.norm(vector))
+
+
+def test_drop_near_duplicates_keeps_identical_reprints_across_leans():
+    articles = [
+        {'id': 1, 'source_lean': 'left', 'embedding': _embedding(0)},
+        {'id': 2, 'source_lean': 'right', 'embedding': _embedding(0)},
+    ]
+    assert [a['id'] for a in synthesizer.drop_near_duplicates(articles)] == [1, 2]
+
+
+def test_drop_near_duplicates_drops_reprints_within_a_lean():
+    articles = [
+        {'id': 1, 'source_lean': 'left', 'embedding': _embedding(0)},
+        {'id': 2, 'source_lean': 'left', 'embedding': _embedding(0)},
+        {'id': 3, 'source_lean': 'left', 'embedding': _embedding(1)},
+        {'id': 4, 'source_lean': 'left'},
+    ]
+    assert [a['id'] for a in synthesizer.drop_near_duplicates(articles)] == [1, 3, 4]